@@ -0,0 +1,224 @@
+import hashlib, io, json, sys, time
+from datetime import date
+from pathlib import Path
+import numpy as np
+
+EMBEDDINGS_DIR = Path(__file__).resolve().parent / "embeddings"
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    """Return float32 rows scaled to unit length (zero rows stay zero)."""
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+def fingerprint(vectors: np.ndarray) -> str:
+    """
+    BLAKE2b digest of the float32 matrix as saved (before normalisation),
+    identifying the embeddings an index was built from.
+    """
+    return hashlib.blake2b(np.ascontiguousarray(vectors, dtype=np.float32).tobytes(), digest_size=16).hexdigest()
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores along the last axis, best first."""
+    k = min(k, scores.shape[-1])
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over unit vectors.
+
+    The vectors are clustered with spherical k-means; each cluster keeps the
+    ids of its members. A query scores the centroids, probes the `n_probe`
+    closest lists and runs an exact dot product over their members only.
+
+    Only the centroids and list layout are saved, the vectors themselves
+    stay in the `.npy` file the index was built from. `build` and `load`
+    take that matrix as saved and normalise it themselves.
+    """
+    def __init__(self, centroids: np.ndarray, ids: np.ndarray, offsets: np.ndarray, vectors: np.ndarray = None,
+                 n_probe: int = 8, fingerprint: str = None):
+        self.centroids = centroids
+        self.ids = ids
+        self.offsets = offsets
+        self.vectors = vectors
+        self.n_probe = n_probe
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: int = None, n_iter: int = 10, sample_per_list: int = 256, seed: int = 0) -> "IVFIndex":
+        """
+        Cluster `vectors` into `n_lists` inverted lists.
+
+        Args:
+            vectors (np.ndarray): (n, d) embedding matrix.
+            n_lists (int, optional): Number of clusters. Defaults to 4 * sqrt(n).
+            n_iter (int): k-means iterations.
+            sample_per_list (int): Training sample size per list; k-means runs on
+                at most n_lists * sample_per_list rows.
+            seed (int): Random seed for reproducible builds.
+        """
+        x = normalize(vectors)
+        n = x.shape[0]
+        n_lists = min(n, n_lists or max(1, int(4 * np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+
+        train = x
+        if n > n_lists * sample_per_list:
+            train = x[rng.choice(n, n_lists * sample_per_list, replace=False)]
+
+        centroids = train[rng.choice(train.shape[0], n_lists, replace=False)]
+        for _ in range(n_iter):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, train)
+            empty = np.bincount(assign, minlength=n_lists) == 0
+            # Re-seed empty clusters from random training rows
+            sums[empty] = train[rng.choice(train.shape[0], int(empty.sum()))]
+            centroids = normalize(sums)
+
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 8192):
+            assign[start:start + 8192] = np.argmax(x[start:start + 8192] @ centroids.T, axis=1)
+        ids = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+
+        return cls(centroids, ids, offsets, vectors=x, fingerprint=fingerprint(vectors))
+
+    def search(self, query: np.ndarray, k: int = 10, n_probe: int = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k search for a single query vector.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Row indices (best first) and their cosine scores.
+        """
+        if self.vectors is None:
+            raise ValueError("IVFIndex has no vectors attached, use IVFIndex.load(path, vectors)")
+        q = normalize(query).reshape(-1)
+        n_probe = min(n_probe or self.n_probe, self.centroids.shape[0])
+        lists = top_k(self.centroids @ q, n_probe)
+        candidates = np.concatenate([self.ids[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+        scores = self.vectors[candidates] @ q
+        best = top_k(scores, k)
+        return candidates[best], scores[best]
+
+    def save(self, path: Path | io.BytesIO, **meta):
+        """
+        Save centroids and list layout to an `.npz` file; `meta` is stored as
+        JSON together with the row count and the fingerprint of the vectors.
+        """
+        np.savez(
+            path,
+            centroids=self.centroids,
+            ids=self.ids,
+            offsets=self.offsets,
+            meta=np.array(json.dumps({
+                "count": int(self.ids.shape[0]),
+                "n_probe": self.n_probe,
+                "fingerprint": self.fingerprint,
+                **meta,
+            })),
+        )
+
+    @classmethod
+    def load(cls, path: Path, vectors: np.ndarray) -> "IVFIndex":
+        """
+        Load an index saved by `save` and attach the matrix it was built from,
+        passed as saved in the `.npy` file (not normalised).
+
+        Raises:
+            ValueError: If the index was built from other embeddings (a
+                different row count or fingerprint), e.g. before re-encoding.
+        """
+        with np.load(path) as f:
+            meta = json.loads(str(f["meta"]))
+            if meta["count"] != vectors.shape[0]:
+                raise ValueError(f"Index {path} covers {meta['count']} rows, embeddings have {vectors.shape[0]}")
+            digest = fingerprint(vectors)
+            if meta.get("fingerprint") != digest:
+                raise ValueError(f"Index {path} was built from other embeddings (version {meta.get('version')}); "
+                                 f"rebuild it with `python -m hts.ann build`")
+            return cls(f["centroids"], f["ids"], f["offsets"], vectors=normalize(vectors),
+                       n_probe=meta["n_probe"], fingerprint=digest)
+
+def index_path(prefix: str, version: str = "latest") -> Path:
+    """Path of the IVF index saved next to `{prefix}_embeddings_{version}.npy`."""
+    suffix = version if version == "latest" else f"v{version}"
+    return EMBEDDINGS_DIR / f"{prefix}_ivf_{suffix}.npz"
+
+def build_index(prefix: str = "tariff_tables", n_lists: int = None, n_probe: int = 8) -> IVFIndex:
+    """
+    Build the IVF index for a saved embedding matrix and save it next to
+    the `.npy` file under its 'latest' and dated names.
+    """
+    vectors = np.load(EMBEDDINGS_DIR / f"{prefix}_embeddings_latest.npy")
+    index = IVFIndex.build(vectors, n_lists=n_lists)
+    index.n_probe = n_probe
+
+    info_path = EMBEDDINGS_DIR / f"{prefix}_info_latest.json"
+    info = json.loads(info_path.read_text(encoding="utf-8")) if info_path.exists() else {}
+    # Both names are recorded in the object store, which keeps their shared chunks once
+    from .src.store import default_store
+    buf = io.BytesIO()
+    index.save(buf, model_name=info.get("model_name"), version=info.get("version"))
+    default_store.save_bytes(buf.getvalue(), index_path(prefix), index_path(prefix, date.today().isoformat()))
+    return index
+
+def benchmark(output_path: str = "ann_benchmark.md", k: int = 10, repeats: int = 20, probes=(1, 4, 8, 16, 32)):
+    """
+    Compare the IVF index against exact search on the `query.QUERIES` list.
+
+    Reports recall@k against the exact top-k and p50/p99 latency of the
+    scoring step (query encoding excluded, it is the same for both).
+    """
+    from .query import QUERIES, get_engine
+
+    engine = get_engine()
+    index = IVFIndex.load(index_path("tariff_tables"), np.load(EMBEDDINGS_DIR / "tariff_tables_embeddings_latest.npy"))
+    vectors = index.vectors
+    q_embs = normalize(engine.model.encode(QUERIES))
+
+    def timed(fn):
+        times = []
+        for _ in range(repeats):
+            for q in q_embs:
+                t0 = time.perf_counter()
+                fn(q)
+                times.append(time.perf_counter() - t0)
+        return np.percentile(times, 50) * 1000, np.percentile(times, 99) * 1000
+
+    exact = [set(top_k(vectors @ q, k).tolist()) for q in q_embs]
+    rows = [("exact", 1.0, *timed(lambda q: top_k(vectors @ q, k)))]
+    for n_probe in probes:
+        found = [set(index.search(q, k, n_probe)[0].tolist()) for q in q_embs]
+        recall = float(np.mean([len(f & e) / len(e) for f, e in zip(found, exact)]))
+        rows.append((f"ivf n_probe={n_probe}", recall, *timed(lambda q: index.search(q, k, n_probe))))
+
+    lines = [
+        "# Benchmarks – Approximate Nearest-Neighbour Search\n\n",
+        f"IVF index over {vectors.shape[0]} tariff rows, {index.centroids.shape[0]} lists.  \n",
+        f"Queries: {len(QUERIES)} from `query.QUERIES`, each timed {repeats} times (query encoding excluded).\n\n",
+        f"| Method               | Recall@{k} | p50 (ms) | p99 (ms) |\n",
+        "|----------------------|-----------|----------|----------|\n",
+    ]
+    for name, recall, p50, p99 in rows:
+        lines.append(f"| {name:<20} | {recall:9.3f} | {p50:8.3f} | {p99:8.3f} |\n")
+    Path(output_path).write_text("".join(lines), encoding="utf-8")
+    print(f"Benchmarks written to {output_path}")
+
+def main(argv=None):
+    """Usage: python -m hts.ann [build|benchmark]"""
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "build"
+    if command == "build":
+        index = build_index()
+        print(f"Built IVF index with {index.centroids.shape[0]} lists over {index.ids.shape[0]} rows")
+    elif command == "benchmark":
+        benchmark()
+    else:
+        raise SystemExit(main.__doc__)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
 from flask import Flask, request, jsonify,  render_template
-from ..query import start_conv, continue_conv
+from ..query import start_conv, continue_conv, lookup_hts
+from ..src.shards import LazyHTSData
 app = Flask(__name__)
 
+_shards = None
+
+def get_shards() -> LazyHTSData:
+    """Chapter-sharded schedule, opened on first use; chapters load as they are requested."""
+    global _shards
+    if _shards is None:
+        _shards = LazyHTSData()
+    return _shards
+
 @app.route("/")
 def index():
     return render_template("base.html")
@@ -28,5 +38,25 @@ def chat():
     result = continue_conv(reply, messages)
     return jsonify(result)
 
+@app.route("/hts/<code>", methods=["GET"])
+def hts(code):
+    limit = request.args.get("limit", 50, type=int)
+    result = lookup_hts(code, limit=limit)
+    if result is None:
+        return jsonify({"error": f"No HTS number matching {code}"}), 404
+    return jsonify(result)
+
+@app.route("/chapter/<ch_number>", methods=["GET"])
+def chapter(ch_number):
+    try:
+        shards = get_shards()
+        chapter = shards.chapter(ch_number)
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 503
+    except KeyError:
+        return jsonify({"error": f"No chapter {ch_number}"}), 404
+    section = shards.section_of(ch_number)
+    return jsonify({"sec_number": section["sec_number"], "section_title": section["title"], **chapter.model_dump()})
+
 if __name__ == "__main__":
     app.run(debug=True)
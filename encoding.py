@@ -1,9 +1,12 @@
-import json, time
+import io, json, sys, time
 from pathlib import Path
 import numpy as np
+import sentence_transformers
 from sentence_transformers import SentenceTransformer
 from datetime import date
 
+MODEL_NAME = "all-MiniLM-L6-v2"
+
 def extract_note_text(note_obj, section_title, chapter_title):
     """
     Recursively extract 'text' and 'sub_items' from a note object.
@@ -39,14 +42,53 @@ def extract_note_text(note_obj, section_title, chapter_title):
     return texts
 
 # ---------- Data loading ----------
-def load_texts(json_path: Path):
+def iter_table_rows(data: dict):
+    """
+    Yield (section_title, chapter_title, row) for every tariff row with a description.
+
+    This is the row order of the `tariff_tables` embeddings; anything that
+    must line up with them (e.g. `rowstore.RowStore.from_hts`) walks the
+    schedule through this generator.
+    """
+    for section in data.get("sections", []):
+        section_title = f"Section {section.get('sec_number', '')}: {section.get('title', '').strip()}".strip(": ")
+        for chapter in section.get("chapters", []) or []:
+            chapter_title = f"{chapter.get('ch_number', '')}: {chapter.get('title', '').strip()}"
+            table = chapter.get("table")
+            if isinstance(table, dict):
+                for row in table.get("rows", []) or []:
+                    if isinstance(row, dict) and row.get("description", ""):
+                        yield section_title, chapter_title, row
+
+def load_texts(json_path: Path, chapters=None):
     """
     Load and separate:
       - chapter_notes
       - tariff_tables
+
+    `json_path` may also be the SQLite store built by `python -m src.db build`
+    (a `.db` file); then only chapter notes and row numbers / descriptions
+    are read from it. A directory is read as the chapter-sharded layout
+    (`src.shards`), where only the shards of `chapters` are opened.
+
+    Args:
+        chapters (iterable, optional): Chapter numbers to keep; all by default.
     """
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    json_path = Path(json_path)
+    if json_path.is_dir():
+        from src.shards import LazyHTSData
+        data = LazyHTSData(json_path).to_dict(chapters)
+    elif json_path.suffix == ".db":
+        from src.db import HTSDatabase
+        with HTSDatabase(json_path) as db:
+            data = db.schedule(include=("notes", "table"), row_fields=("htsno", "description"))
+    else:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    if chapters is not None and not json_path.is_dir():
+        wanted = {str(c) for c in chapters}
+        for section in data.get("sections", []):
+            section["chapters"] = [c for c in section.get("chapters") or [] if str(c.get("ch_number")) in wanted]
 
     chapter_notes = []
     tariff_tables = []
@@ -63,26 +105,52 @@ def load_texts(json_path: Path):
                         extracted = extract_note_text(note, section_title, chapter_title)
                         chapter_notes.extend(extracted)
 
-            table = chapter.get("table")
-            if isinstance(table, dict):
-                for row in table.get("rows", []) or []:
-                    if isinstance(row, dict):
-                        desc = row.get("description", "")
-                        hts = row.get("htsno")
-                        if desc:
-                            tariff_tables.append({
-                                "text": desc.strip(),
-                                "section_title": section_title,
-                                "chapter_title": chapter_title,
-                                "htsno": hts
-                            })
+    for section_title, chapter_title, row in iter_table_rows(data):
+        tariff_tables.append({
+            "text": row["description"].strip(),
+            "section_title": section_title,
+            "chapter_title": chapter_title,
+            "htsno": row.get("htsno")
+        })
 
     return chapter_notes, tariff_tables
 
+def group_offsets(items, key: str = "chapter_title") -> dict:
+    """
+    Build an offsets table mapping each value of `key` to its contiguous
+    [start, end) row range in `items`.
+
+    `load_texts` emits notes chapter by chapter, so every chapter occupies one
+    block of rows; a value that reappears after another one raises ValueError.
+    """
+    offsets = {}
+    last = None
+    for i, item in enumerate(items):
+        value = item.get(key)
+        if value == last:
+            offsets[value][1] = i + 1
+            continue
+        if value in offsets:
+            raise ValueError(f"Rows for {key}={value!r} are not contiguous")
+        offsets[value] = [i, i + 1]
+        last = value
+    return offsets
+
 # ---------- Encoding ----------
-def encode_and_save(items, model, prefix):
+def encode_and_save(items, model, prefix, model_name: str = MODEL_NAME, index_key: str = None, cache=None):
     """
     Encode texts or note dicts into embeddings and save embeddings + metadata.
+
+    Texts already in the embedding cache (`src.embcache`, keyed by model
+    name and normalised text) are not encoded again; only cache misses go
+    to `model.encode`. An `{prefix}_info` file records the encoder name and
+    version used, so loaders can refuse embeddings produced by a different
+    model. When `index_key` is given, an `{prefix}_index` file with the row
+    range of each key value is saved as well (see `group_offsets`).
+
+    Returns:
+        tuple[float, dict]: Seconds spent embedding, and the cache counts
+            (`texts`, `hits`, `misses`, `encoded`), see `EmbeddingCache.encode`.
     """
     out_dir = Path("embeddings")
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -93,42 +161,66 @@ def encode_and_save(items, model, prefix):
     else:
         texts = items
 
+    from src.embcache import EmbeddingCache
+    if cache is None:
+        cache = EmbeddingCache(model_name, sentence_transformers.__version__)
     start = time.perf_counter()
-    embeddings = model.encode(texts, batch_size=32, show_progress_bar=True)
+    embeddings, stats = cache.encode(texts, lambda batch: model.encode(batch, batch_size=32, show_progress_bar=True))
     duration = time.perf_counter() - start
-
-    # Save embeddings
-    np.save(out_dir / f"{prefix}_embeddings_v{version}.npy", embeddings)
-    np.save(out_dir / f"{prefix}_embeddings_latest.npy", embeddings)
-
-    # Save metadata
-    with open(out_dir / f"{prefix}_metadata_v{version}.json", "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
-    with open(out_dir / f"{prefix}_metadata_latest.json", "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
-
-    return duration
+    cache.save()
+
+    # Save embeddings and metadata; both names are recorded in the object store
+    from src.store import default_store
+    def save(name, data: bytes):
+        stem, suffix = name.rsplit(".", 1)
+        default_store.save_bytes(data, out_dir / f"{prefix}_{stem}_latest.{suffix}", out_dir / f"{prefix}_{stem}_v{version}.{suffix}")
+
+    buf = io.BytesIO()
+    np.save(buf, embeddings)
+    save("embeddings.npy", buf.getvalue())
+    save("metadata.json", json.dumps(items, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    # Save encoder info
+    info = {
+        "model_name": model_name,
+        "encoder_version": sentence_transformers.__version__,
+        "count": int(embeddings.shape[0]),
+        "dim": int(embeddings.shape[1]),
+        "version": version,
+    }
+    save("info.json", json.dumps(info, indent=2).encode("utf-8"))
+
+    # Save row ranges per group
+    if index_key:
+        offsets = group_offsets(items, index_key)
+        save("index.json", json.dumps(offsets, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    return duration, stats
 
 # ---------- Main ----------
 def main():
-    model_name = "all-MiniLM-L6-v2"
+    model_name = MODEL_NAME
     model = SentenceTransformer(model_name)
     json_path = Path("data/hts/hts_full_latest.json")
+    if len(sys.argv) > 1 and sys.argv[1] == "--db":
+        json_path = Path("data/hts.db")
 
     chapter_notes, tariff_tables = load_texts(json_path)
     results = []
+    from src.embcache import EmbeddingCache
+    cache = EmbeddingCache(model_name, sentence_transformers.__version__)
 
     # Encode each dataset and track performance
     datasets = [
-        ("chapter_notes", chapter_notes),
-        ("tariff_tables", tariff_tables),
+        ("chapter_notes", chapter_notes, "chapter_title"),
+        ("tariff_tables", tariff_tables, None),
     ]
 
-    for name, data_list in datasets:
+    for name, data_list, index_key in datasets:
         if not data_list:
             continue
-        duration = encode_and_save(data_list, model, name)
-        results.append((name.replace("_", " ").title(), len(data_list), model_name, duration))
+        duration, stats = encode_and_save(data_list, model, name, model_name, index_key=index_key, cache=cache)
+        results.append((name.replace("_", " ").title(), len(data_list), model_name, duration, stats))
 
     # ---------- Benchmark Markdown ----------
     md_path = Path("benchmarks.md")
@@ -137,14 +229,17 @@ def main():
         "\nThis file records how long the embedding process takes on the available hardware.  \n",
         f"All embeddings were generated with [`sentence-transformers`](https://www.sbert.net) using the `{model_name}` model.\n",
         "\n## Notes\n\n",
-        "- All times measured with `time.perf_counter()` before and after `model.encode()`.\n",
+        "- All times measured with `time.perf_counter()` around the cache lookup and `model.encode()` of the cache misses.\n",
+        "- Texts are cached by model name and normalised text (`embeddings/cache/`); a hit is not encoded again.\n",
+        "- # Texts = cache hits + misses; Encoded counts the distinct texts among the misses.\n",
         "- Batch size: 32\n\n",
         "## Results\n\n",
-        "| Dataset              | # Texts | Model                | Time (seconds) |\n",
-        "|----------------------|---------|----------------------|----------------|\n",
+        "| Dataset              | # Texts | Model                | Cache hits | Hit rate | Misses | Encoded | Time (seconds) |\n",
+        "|----------------------|---------|----------------------|------------|----------|--------|---------|----------------|\n",
     ]
-    for name, count, model_name, duration in results:
-        lines.append(f"| {name:<25} | {count:5d} | {model_name:<20} | {duration:10.2f} |\n")
+    for name, count, model_name, duration, stats in results:
+        rate = stats["hits"] / count if count else 0
+        lines.append(f"| {name:<25} | {count:5d} | {model_name:<20} | {stats['hits']:10d} | {rate:7.1%} | {stats['misses']:6d} | {stats['encoded']:7d} | {duration:10.2f} |\n")
 
     md_path.write_text("".join(lines), encoding="utf-8")
     print("Benchmarks written to benchmarks.md")
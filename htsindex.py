@@ -0,0 +1,229 @@
+import re, sys, time
+from pathlib import Path
+import numpy as np
+from .rowstore import RowStore, rows_path
+
+HTS_PATH = Path("data/hts/hts_full_latest.json")
+_END = "\uffff"  # sorts after every digit, closes a prefix range
+
+def normalize(htsno: str | None) -> str:
+    """Digits of an HTS number: "6214.10.10 00" and "6214101000" both give "6214101000"; "8703.*" gives "8703"."""
+    return re.sub(r"\D", "", htsno or "")
+
+def parent_pointers(indents: list, chapter_ids) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parent row and depth of every row from its `indent`.
+
+    A row's parent is the closest row above it in the same chapter with a
+    smaller indent; rows at the top of a chapter get -1. Computed in one
+    pass with a stack of open headings.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: int32 parent row per row and int16 depth.
+    """
+    n = len(indents)
+    parent = np.full(n, -1, dtype=np.int32)
+    depth = np.zeros(n, dtype=np.int16)
+    stack, chapter = [], None
+    for i, (indent, ch) in enumerate(zip(indents, chapter_ids)):
+        if ch != chapter:
+            stack, chapter = [], ch
+        try:
+            level = int(indent)
+        except (TypeError, ValueError):
+            level = 0
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        if stack:
+            parent[i] = stack[-1][1]
+        depth[i] = len(stack)
+        stack.append((level, i))
+    return parent, depth
+
+class HTSIndex:
+    """
+    Sorted-array index over normalised HTS numbers, with parent pointers.
+
+    `keys` holds the normalised `htsno` of every numbered row in sorted
+    order and `order` the row each key belongs to, so exact lookup and
+    prefix listing are binary searches (`np.searchsorted`). `parent` links
+    each row to its heading via `indent`, so the path from a row up to the
+    top of its chapter costs O(depth). Row ids are positions in `rows` (a
+    RowStore in `tariff_tables` embedding order), which supplies the
+    descriptions and rates returned by `record`.
+    """
+    def __init__(self, rows: RowStore, keys: np.ndarray, order: np.ndarray, parent: np.ndarray, depth: np.ndarray):
+        self.rows = rows
+        self.keys = keys
+        self.order = order
+        self.parent = parent
+        self.depth = depth
+
+    @classmethod
+    def from_store(cls, rows: RowStore) -> "HTSIndex":
+        """Build the index for a RowStore that has `htsno` and `indent` columns (e.g. `RowStore.from_hts`)."""
+        if "indent" not in rows.columns:
+            raise ValueError("Rows have no indent column; build the store from hts_full (python -m hts.rowstore build)")
+        htsnos = [normalize(h) for h in rows.column("htsno")]
+        parent, depth = parent_pointers(rows.column("indent"), rows.chapter_ids.tolist())
+        numbered = np.flatnonzero([bool(h) for h in htsnos]).astype(np.int32)
+        keys = np.array([htsnos[i] for i in numbered], dtype=str)
+        sort = np.argsort(keys, kind="stable")
+        return cls(rows, keys[sort], numbered[sort], parent, depth)
+
+    def __len__(self):
+        return len(self.keys)
+
+    # ---------- Queries ----------
+    def lookup(self, htsno: str) -> int | None:
+        """Row of an exact HTS number (punctuation ignored), or None."""
+        key = normalize(htsno)
+        i = int(np.searchsorted(self.keys, key, side="left"))
+        if key and i < len(self.keys) and self.keys[i] == key:
+            return int(self.order[i])
+        return None
+
+    def prefix(self, prefix: str, limit: int = None) -> list[int]:
+        """Rows whose HTS number starts with `prefix` ("8703", "8703.*", "8703.23"), in code order."""
+        key = normalize(prefix)
+        if not key:
+            return []
+        lo = int(np.searchsorted(self.keys, key, side="left"))
+        hi = int(np.searchsorted(self.keys, key + _END, side="left"))
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self.order[lo:hi].tolist()
+
+    def count_prefix(self, prefix: str) -> int:
+        """Number of rows under `prefix`, without listing them."""
+        key = normalize(prefix)
+        if not key:
+            return 0
+        return int(np.searchsorted(self.keys, key + _END) - np.searchsorted(self.keys, key))
+
+    def ancestors(self, row: int) -> list[int]:
+        """Heading rows above `row`, outermost first (unnumbered headings such as "Other:" included)."""
+        path = []
+        p = int(self.parent[row])
+        while p >= 0:
+            path.append(p)
+            p = int(self.parent[p])
+        return path[::-1]
+
+    def record(self, row: int) -> dict:
+        """Row as a dict: its RowStore fields plus `row` and `depth`."""
+        return {"row": row, "depth": int(self.depth[row]), **self.rows[row]}
+
+    def resolve(self, code: str, limit: int = 50) -> dict | None:
+        """
+        Everything a caller needs for one code: the exact row with its
+        heading path, and the rows under it as a prefix.
+
+        Returns:
+            dict | None: {"match", "path", "prefix_count", "prefix"} with row
+                records, or None when nothing matches.
+        """
+        row = self.lookup(code)
+        under = self.prefix(code, limit)
+        if row is None and not under:
+            return None
+        return {
+            "match": self.record(row) if row is not None else None,
+            "path": [self.record(p) for p in self.ancestors(row)] if row is not None else [],
+            "prefix_count": self.count_prefix(code),
+            "prefix": [self.record(r) for r in under],
+        }
+
+def load_hts_index(prefix: str = "tariff_tables") -> HTSIndex:
+    """
+    HTSIndex over the saved RowStore (`python -m hts.rowstore build`), or
+    over `hts_full_latest.json` when that file is missing.
+    """
+    path = rows_path(prefix)
+    rows = RowStore.load(path) if path.exists() else None
+    if rows is None or "indent" not in rows.columns:
+        if not HTS_PATH.exists():
+            raise FileNotFoundError(f"{HTS_PATH} not found; run ingesting.py first")
+        rows = RowStore.from_hts(HTS_PATH)
+    return HTSIndex.from_store(rows)
+
+def benchmark(output_path: str = "htsindex_benchmark.md", n_queries: int = 1000):
+    """
+    Time exact lookup, prefix listing and ancestor paths through the index
+    against the linear scans they replace, and write a Markdown table.
+    """
+    t0 = time.perf_counter()
+    index = load_hts_index()
+    build_time = time.perf_counter() - t0
+    rows = index.rows
+    htsnos = rows.column("htsno")
+    indents = rows.column("indent")
+    rng = np.random.default_rng(0)
+    sample = [htsnos[int(r)] for r in rng.choice(index.order, size=min(n_queries, len(index)), replace=False)]
+    headings = sorted({normalize(h)[:4] for h in sample})
+
+    def scan_lookup(code):
+        key = normalize(code)
+        return next((i for i, h in enumerate(htsnos) if normalize(h) == key), None)
+
+    def scan_prefix(p):
+        return [i for i, h in enumerate(htsnos) if normalize(h).startswith(p)]
+
+    def scan_path(row):
+        # Walk back up the rows looking for each smaller indent
+        path, level = [], int(indents[row] or 0)
+        for i in range(row - 1, -1, -1):
+            if rows.chapter_ids[i] != rows.chapter_ids[row] or level == 0:
+                break
+            if int(indents[i] or 0) < level:
+                path.append(i)
+                level = int(indents[i] or 0)
+        return path[::-1]
+
+    cases = [
+        ("Exact lookup", sample, scan_lookup, index.lookup),
+        ("Prefix listing (heading)", headings, scan_prefix, index.prefix),
+        ("Ancestor path", [index.lookup(h) for h in sample], scan_path, index.ancestors),
+    ]
+    lines = [
+        "# Benchmarks – HTS Code Index\n\n",
+        f"{len(rows)} rows, {len(index)} numbered; index built in {build_time:.2f} seconds "
+        f"(including loading the rows). Times are per query.\n\n",
+        "| Operation                | Queries | Linear scan (ms) | Index (ms) | Speed-up |\n",
+        "|--------------------------|---------|------------------|------------|----------|\n",
+    ]
+    for name, queries, scan, indexed in cases:
+        scan_queries = queries[:50]  # scans are slow; a subset is enough
+        t0 = time.perf_counter()
+        for q in scan_queries:
+            expected = scan(q)
+        t_scan = (time.perf_counter() - t0) / len(scan_queries)
+        t0 = time.perf_counter()
+        for q in queries:
+            got = indexed(q)
+        t_index = (time.perf_counter() - t0) / len(queries)
+        lines.append(f"| {name:<24} | {len(queries):7d} | {t_scan * 1000:16.3f} | {t_index * 1000:10.4f} | {t_scan / t_index:7.0f}x |\n")
+    Path(output_path).write_text("".join(lines), encoding="utf-8")
+    print(f"Benchmarks written to {output_path}")
+
+def main(argv=None):
+    """
+    Usage:
+        python -m hts.htsindex CODE        # row, heading path and rows under CODE
+        python -m hts.htsindex benchmark   # writes htsindex_benchmark.md
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        raise SystemExit(main.__doc__)
+    if argv[0] == "benchmark":
+        benchmark()
+        return
+    result = load_hts_index().resolve(argv[0])
+    if result is None:
+        raise SystemExit(f"No HTS number matching {argv[0]}")
+    for r in result["path"] + ([result["match"]] if result["match"] else []):
+        print(f"{'  ' * r['depth']}{r['htsno'] or '':<14} {r['text']}")
+    print(f"{result['prefix_count']} rows under {argv[0]}")
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,46 @@
-from src.notes import GeneralNotesSource, SectionNotesSource, ChapterNotesSource, AdditionalUSNotesSource
+from src.notes import GeneralNotesSource, ChapterPdfSource
 from src.tables import TariffTableSource
 from src.ingest import HTSSource
 from src.rules import GeneralRules
-import time
+import argparse, os, time
 from pathlib import Path
 from src.utils import combine
-def main():
+from src.pipeline import Dataset, run_pipeline
+from src.ratelimit import MAX_PER_HOST, limiter_stats
+from src.journal import Journal, digest
+from src.cache import sha256_file
+from src.manifest import Manifest
+from src import db as hts_db
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest HTS data and benchmark each stage.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Processes in the parse pool (1 parses in this process).")
+    parser.add_argument("--recycle-after", type=int, default=10,
+                        help="Documents a parse worker handles before it is replaced.")
+    parser.add_argument("--fetch-workers", type=int, default=MAX_PER_HOST,
+                        help="Upper bound on concurrent downloads per dataset (the host limiter adapts below it).")
+    parser.add_argument("--queue-size", type=int, default=16,
+                        help="Fetched documents allowed to wait for a parse worker before fetching pauses.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip items already recorded in the checkpoint journal and reuse their output.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-check every document but only parse and save the ones whose source changed.")
+    parser.add_argument("--sharded", action="store_true",
+                        help="Also write one compact file per chapter plus a manifest (data/hts/chapters/).")
+    parser.add_argument("--db", action="store_true",
+                        help="Also build the SQLite store (data/hts.db) with FTS5 keyword indexes.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """
     Executes a benchmark pipeline for HTS (Harmonized Tariff Schedule) data ingestion.
 
     The pipeline measures the performance of fetching, parsing, and saving
     various datasets, including general notes, section notes, chapter notes,
-    additional U.S. notes, and tariff tables. 
+    additional U.S. notes, and tariff tables. Section, chapter and additional
+    U.S. notes come from one combined "Chapter PDFs" stage that fetches and
+    parses each chapter PDF once.
 
     It produces:
         - Total processing time per dataset
@@ -21,26 +50,53 @@ def main():
         - Per-stage timings
         - Per-chapter fetch and parse timings
 
+    All datasets stream through one fetch -> parse -> save pipeline
+    (`src.pipeline.run_pipeline`) with bounded queues between the stages, so
+    downloads, parsing and saving overlap within and across datasets.
+    Fetching runs in a thread pool (`--fetch-workers`) whose concurrency per
+    host is adapted AIMD-style by `src.ratelimit`, honouring Retry-After.
+    Parsing runs in a process pool (`--workers`, `--recycle-after`); at most
+    `--queue-size` fetched documents wait for it before fetching pauses.
+    Datasets are rebuilt in chapter order, so saved output matches a
+    sequential run.
+
+    Every fetched and parsed item is written to a checkpoint journal
+    (`data/journal/ingest_journal.jsonl`) as soon as it finishes. With
+    `--resume`, items already in the journal are neither fetched nor parsed
+    again; `save()` output is rebuilt from the journal plus the new items.
+
+    With `--incremental`, every document is re-checked with a conditional
+    request (unchanged files cost a 304) and hashed; only items whose hash
+    differs from `data/manifest.json` are parsed, datasets with no changes
+    are not saved again, and `combine()` is skipped when nothing changed.
+
     Results are written to a Markdown file (`benchmarkIngest.md`) with:
         - Summary table of total times and throughput
         - Table of per-stage timings
+        - Pipeline wall-clock time next to the sum of stage times
+        - Parse pool utilisation
+        - Fetch concurrency per host
+        - Release id and changed items per dataset
         - Per-chapter timings for each dataset
     """
-    
+    args = parse_args(argv)
+
     # ----------------- Initialize data source handlers -----------------
     hts = HTSSource()
     gen_note = GeneralNotesSource()      # General notes
-    sec_note = SectionNotesSource()      # Section notes
-    ch_note = ChapterNotesSource()       # Chapter notes
-    us_note = AdditionalUSNotesSource()  # Additional U.S. notes
+    ch_pdf = ChapterPdfSource()          # Section, chapter and additional U.S. notes
     table = TariffTableSource()          # Tariff tables
     rules = GeneralRules()               # Rules of interpretation
 
     # ----------------- Initialize storage containers -----------------
-    listGen, listSec, listCh, listUs, listTar, listRules = [], [], [], [], [], []  # Parsed data storage
+    listGen, listChPdf, listTar, listRules = [], [], [], []  # Parsed data storage
     benchmarks = []       # Total timing per dataset
     per_stage = []         # Per-stage timing (fetch, parse, save)
     per_item_timings = {} # Per-chapter timings
+    resumed = []          # Items reused from the journal per dataset
+    changes = []          # Items checked / changed per dataset (incremental runs)
+    journal = Journal(resume=args.resume or args.incremental)
+    manifest = Manifest()
 
     # Chapters to process (can expand range for more chapters, chapter 77 is excluded)
     chapters = [ch for ch in range(1, 100) if ch != 77] 
@@ -50,71 +106,131 @@ def main():
     # chapters = [1,1,1,1,1]
     # gen_ch = [1,1,1,1,1]  
     
-    hts_path = hts.fetch()
-    hts_data = hts.parse(hts_path)
-    hts.save(hts_data)
+    def single_document(name, source, key):
+        """
+        Fetch, parse and save a one-file dataset (TOC, rules) unless it is already done.
 
-    rules_path = rules.fetch()
-    rules_data = rules.parse(rules_path)
-    rules.save(rules_data)
+        Returns:
+            str | None: Path of the fetched document, or None if it was not fetched.
+        """
+        if args.incremental:
+            path = source.fetch()
+            source_hash = sha256_file(Path(path))
+            unchanged = not manifest.changed(name, key, source_hash) and journal.has(name, key, "saved")
+            changes.append((name, 1, 0 if unchanged else 1))
+            if unchanged:
+                return path
+        elif journal.has(name, key, "saved"):
+            return None
+        else:
+            path = source.fetch()
+            source_hash = sha256_file(Path(path))
+        data = source.parse(path)
+        source.save(data)
+        entry = journal.record(name, key, "saved", data=data, source_hash=source_hash)
+        manifest.update(name, key, source_hash, entry["hash"])
+        return path
+
+    hts_path = single_document("HTS Sections", hts, "toc")
+    single_document("General Rules", rules, "rules")
+    previous_release = manifest.release
+    if hts_path:
+        manifest.release = hts.release_id(hts_path)
 
-    def benchmark_dataset(name, source, append_list, chapters, parse_ch=False):
+    def make_dataset(name, source, append_list, chapters, parse_ch=False):
         """
-        Benchmarks a single dataset by measuring fetch, parse, and save times.
+        Describe one dataset for the streaming pipeline.
 
         Args:
             name (str): Dataset name for reporting.
             source (object): Source handler with `fetch`, `parse`, `save` methods.
-            append_list (list): List to store parsed data.
+            append_list (list): Receives the output hash of every item in the saved dataset.
             chapters (iterable): Chapters to process.
             parse_ch (bool): Whether to pass chapter number to parse.
 
-        Side Effects:
-            - Appends parsed data to `append_list`.
-            - Updates global `benchmarks`, `per-stage`, and `per_item_timings`.
+        Side Effects (as the pipeline runs):
+            - Appends output hashes to `append_list` (parsed data stays in the journal).
+            - Updates `benchmarks`, `per_stage`, `per_item_timings`, `resumed` and `changes`.
+            - Appends fetched, parsed and saved entries to the checkpoint journal.
         """
-        fetch_time = parse_time = 0.0
         per_item_timings[name] = []  # Initialize per-chapter timing
 
-        for ch in chapters:
-            # ---------- Fetch step ----------
-            t0 = time.perf_counter()
-            path = source.fetch(ch)  # Fetch raw data
-            ft = time.perf_counter() - t0
-            fetch_time += ft
+        # Items finished in an earlier, interrupted run; incremental runs re-check everything
+        fetch_list = chapters if args.incremental else [ch for ch in chapters if not journal.has(name, ch, "parsed")]
+        resumed.append((name, len(chapters) - len(fetch_list)))
+        source_hashes, new_items = {}, {}
+
+        def on_fetched(ch, path, ft):
+            source_hashes[ch] = sha256_file(Path(path))
+            journal.record(name, ch, "fetched", output_hash=source_hashes[ch], path=str(path))
+            # Incremental runs only parse items whose source changed since the last ingest;
+            # unchanged items reuse their journaled output, if the journal still has it
+            unchanged = not manifest.changed(name, ch, source_hashes[ch]) and journal.has(name, ch, "parsed")
+            return not (args.incremental and unchanged)
+
+        def on_parsed(ch, data, pt):
+            # Only the hash stays in memory; the output itself is read back from the journal when saving
+            entry = journal.record(name, ch, "parsed", data=data, parse_time=pt, source_hash=source_hashes[ch])
+            new_items[ch] = entry["hash"]
+
+        def on_done():
+            ds = datasets[name]
+            for ch in fetch_list:
+                # Record per-chapter timing
+                per_item_timings[name].append((ch, ds.fetch_times[ch], ds.parse_times.get(ch, 0.0)))
+                manifest.update(name, ch, source_hashes[ch], journal.get(name, ch, "parsed")["hash"])
+            if args.incremental:
+                changes.append((name, len(fetch_list), len(new_items)))
+
+            # The dataset in chapter order, as output hashes; items that parsed to nothing have none
+            hashes = [journal.get(name, ch, "parsed")["hash"] for ch in chapters]
+            append_list.extend(h for h in hashes if h)
+
+            # Save (skipped when an incremental run found no changes)
+            if not new_items and journal.has(name, "all", "saved"):
+                return 0.0
+
+            def items():
+                # One chapter at a time from the journal, so the whole dataset is never in memory
+                for ch, h in zip(chapters, hashes):
+                    if h:
+                        yield journal.parsed(name, ch)
 
-            # ---------- Parse step ----------
             t0 = time.perf_counter()
-            if parse_ch:
-                data = source.parse(path, ch)  # Parse with chapter number
-            else:
-                data = source.parse(path)      # Generic parse
-            pt = time.perf_counter() - t0
-            parse_time += pt
-
-            if data:
-                append_list.append(data)  # Store parsed data
-
-            # Record per-chapter timing
-            per_item_timings[name].append((ch, ft, pt))
-
-        # ---------- Save step ----------
-        t0 = time.perf_counter()
-        source.save(append_list)  # Save entire dataset
-        st = time.perf_counter() - t0
-
-        # Record overall timings
-        total_time = fetch_time + parse_time + st
-        benchmarks.append((name, len(append_list), total_time))
-        per_stage.append((name, fetch_time, parse_time, st))
-
-    # ----------------- Run benchmarks for all datasets -----------------
-    benchmark_dataset("General Notes", gen_note, listGen, gen_ch, parse_ch=True)
-    benchmark_dataset("Section Notes", sec_note, listSec, chapters)
-    benchmark_dataset("Chapter Notes", ch_note, listCh, chapters)
-    benchmark_dataset("Additional U.S. Notes", us_note, listUs, chapters)
-    benchmark_dataset("Tariff Tables", table, listTar, chapters)
-    combine()
+            source.save(items())  # Save entire dataset
+            st = time.perf_counter() - t0
+            journal.record(name, "all", "saved", output_hash=digest(append_list))
+            return st
+
+        return Dataset(name, source, fetch_list, on_done, parse_ch=parse_ch, on_fetched=on_fetched, on_parsed=on_parsed)
+
+    # ----------------- Run all datasets through one streaming pipeline -----------------
+    datasets = {
+        ds.name: ds for ds in (
+            make_dataset("General Notes", gen_note, listGen, gen_ch, parse_ch=True),
+            make_dataset("Chapter PDFs", ch_pdf, listChPdf, chapters),
+            make_dataset("Tariff Tables", table, listTar, chapters, parse_ch=True),
+        )
+    }
+    run_stats = run_pipeline(
+        list(datasets.values()),
+        fetch_workers=args.fetch_workers, parse_workers=args.workers,
+        recycle_after=args.recycle_after, queue_size=args.queue_size,
+    )
+    for (name, ds), data in zip(datasets.items(), (listGen, listChPdf, listTar)):
+        # Record overall timings: the dataset's span in the pipeline, and the summed time per stage
+        ft, pt = sum(ds.fetch_times.values()), sum(ds.parse_times.values())
+        benchmarks.append((name, len(data), ds.finished - ds.started))
+        per_stage.append((name, ft, pt, ds.save_time))
+
+    combined = not args.incremental or any(n for _, _, n in changes)
+    combine_stats = combine(sharded=args.sharded) if combined else None
+    db_counts = None
+    if args.db and (combined or not hts_db.DB_PATH.exists()):
+        db_counts = hts_db.build()
+    manifest.save()
+    journal.compact()  # keep only the latest entry per step so the journal does not grow every release
+    journal.close()
     # ----------------- Write Markdown report -----------------
     md_path = Path("benchmarkIngest.md")
     lines = [
@@ -143,6 +259,74 @@ def main():
     for name, ft, pt, st in per_stage:
         lines.append(f"| {name:<20} | {ft:8.2f} | {pt:8.2f} | {st:7.2f} |\n")
 
+    # ----------------- Pipeline overlap -----------------
+    stage_sum = run_stats["fetch"] + run_stats["parse"] + run_stats["save"]
+    lines.append("\n## Pipeline\n\n")
+    lines.append(
+        "Stages overlap, so the wall-clock time is below the sum of the stage times "
+        "(fetch and parse times are summed over items).\n\n"
+    )
+    lines.append("| Wall-clock(s) | Fetch(s) | Parse(s) | Save(s) | Sum of stages(s) | Overlap |\n")
+    lines.append("|---------------|----------|----------|---------|------------------|---------|\n")
+    lines.append(
+        f"| {run_stats['wall']:13.2f} | {run_stats['fetch']:8.2f} | {run_stats['parse']:8.2f} | "
+        f"{run_stats['save']:7.2f} | {stage_sum:16.2f} | {stage_sum / run_stats['wall'] if run_stats['wall'] else 0:6.2f}x |\n"
+    )
+
+    # ----------------- Parse pool utilisation -----------------
+    lines.append("\n## Parse pool\n\n")
+    lines.append(f"Workers recycled after {args.recycle_after} documents; up to {args.queue_size} fetched documents queued.\n\n")
+    lines.append("| Workers | Busy(s) | Utilisation |\n")
+    lines.append("|---------|---------|-------------|\n")
+    lines.append(f"| {run_stats['workers']:7d} | {run_stats['parse']:7.2f} | {run_stats['utilisation']:10.0%} |\n")
+
+    # ----------------- Resumed items -----------------
+    if args.resume:
+        lines.append("\n## Resumed from journal\n\n")
+        lines.append("| Dataset              | Items reused |\n")
+        lines.append("|----------------------|--------------|\n")
+        for name, count in resumed:
+            lines.append(f"| {name:<20} | {count:12d} |\n")
+
+    # ----------------- Fetch concurrency -----------------
+    lines.append("\n## Fetch concurrency\n\n")
+    lines.append(f"Up to {args.fetch_workers} fetch threads; per-host limit adapted by AIMD.\n\n")
+    lines.append("| Host                 | Requests | Peak limit | Final limit | Decreases | Throttled (429) |\n")
+    lines.append("|----------------------|----------|------------|-------------|-----------|-----------------|\n")
+    for host, st in limiter_stats().items():
+        lines.append(
+            f"| {host:<20} | {st['requests']:8d} | {st['peak']:10d} | {st['limit']:11d} | {st['decreases']:9d} | {st['throttled']:15d} |\n"
+        )
+
+    # ----------------- Incremental re-ingest -----------------
+    if args.incremental:
+        lines.append("\n## Incremental re-ingest\n\n")
+        lines.append(f"Release: {manifest.release} (previous: {previous_release})\n\n")
+        lines.append("| Dataset              | Checked | Changed |\n")
+        lines.append("|----------------------|---------|---------|\n")
+        for name, checked, changed in changes:
+            lines.append(f"| {name:<20} | {checked:7d} | {changed:7d} |\n")
+
+    # ----------------- Combine -----------------
+    if combine_stats:
+        lines.append("\n## Combine\n\n")
+        lines.append("Only chapters whose inputs changed since the last combine are rebuilt; the rest are copied as bytes.\n\n")
+        lines.append("| Chapters | Rebuilt | Reused | Time (seconds) |\n")
+        lines.append("|----------|---------|--------|----------------|\n")
+        lines.append(
+            f"| {combine_stats['chapters']:8d} | {combine_stats['rebuilt']:7d} | {combine_stats['reused']:6d} | {combine_stats['seconds']:14.2f} |\n"
+        )
+
+    # ----------------- SQLite store -----------------
+    if db_counts:
+        seconds = db_counts.pop("seconds")
+        lines.append("\n## SQLite store\n\n")
+        lines.append(f"Built `{hts_db.DB_PATH}` in {seconds:.2f} seconds.\n\n")
+        lines.append("| Table      | Rows    |\n")
+        lines.append("|------------|---------|\n")
+        for table, count in db_counts.items():
+            lines.append(f"| {table:<10} | {count:7d} |\n")
+
     # ----------------- Per-chapter timings -----------------
     lines.append("\n## Per-chapter timings\n\n")
     for dataset, items in per_item_timings.items():
@@ -1,15 +1,26 @@
-import json, time, re
+import json, threading, time, re
 import numpy as np
+import torch
+import sentence_transformers
 from sentence_transformers import SentenceTransformer, util
 from pathlib import Path
 import matplotlib.pyplot as plt
 from .llama import load_llama, analyze_hts, chat_llama, analyze_notes
+from .encoding import MODEL_NAME, group_offsets
+from .ann import IVFIndex, index_path, normalize, top_k as select_top_k
+from .rowstore import load_rows
+from .htsindex import HTSIndex, load_hts_index
 
-def load_embeddings(prefix: str):
+EMBEDDINGS_DIR = Path(__file__).resolve().parent / "embeddings"
+
+def load_embeddings(prefix: str, model_name: str = None):
     """
     Load precomputed embeddings and metadata given a prefix name.
     Args:
         prefix (str): Dataset prefix (e.g., 'section_titles', 'chapter_notes').
+        model_name (str, optional): If given, the `{prefix}_info_latest.json` file
+            written by `encoding.py` must name this encoder and the installed
+            sentence-transformers version, otherwise a ValueError is raised.
     Returns:
         tuple: (metadata, embeddings)
             - metadata: List of dictionaries describing the text entries.
@@ -17,7 +28,7 @@ def load_embeddings(prefix: str):
     """
     # emb_path = Path(f"embeddings/{prefix}_embeddings_latest.npy")
     # meta_path = Path(f"embeddings/{prefix}_metadata_latest.json")
-    base_dir = Path(__file__).resolve().parent / "embeddings"
+    base_dir = EMBEDDINGS_DIR
     emb_path = base_dir / f"{prefix}_embeddings_latest.npy"
     meta_path = base_dir / f"{prefix}_metadata_latest.json"
 
@@ -26,8 +37,182 @@ def load_embeddings(prefix: str):
 
     embeddings = np.load(emb_path)
     metadata = json.load(open(meta_path, "r", encoding="utf-8"))
+
+    if model_name is not None:
+        info_path = base_dir / f"{prefix}_info_latest.json"
+        if not info_path.exists():
+            raise ValueError(f"No encoder info for prefix '{prefix}', re-run encoding.py")
+        info = json.loads(info_path.read_text(encoding="utf-8"))
+        if info.get("model_name") != model_name:
+            raise ValueError(
+                f"Embeddings for '{prefix}' were made with {info.get('model_name')}, expected {model_name}"
+            )
+        if info.get("encoder_version") != sentence_transformers.__version__:
+            raise ValueError(
+                f"Embeddings for '{prefix}' were made with sentence-transformers "
+                f"{info.get('encoder_version')}, installed is {sentence_transformers.__version__}"
+            )
+        if len(metadata) != embeddings.shape[0] or info.get("count") != embeddings.shape[0]:
+            raise ValueError(f"Embeddings and metadata for '{prefix}' are out of sync")
+
     return metadata, embeddings
 
+def load_offsets(prefix: str, metadata: list[dict], key: str = "chapter_title") -> dict:
+    """
+    Load the `{prefix}_index_latest.json` offsets table saved by `encoding.py`,
+    or rebuild it from the metadata when the file is missing.
+    Returns:
+        dict: Mapping of key value (e.g. chapter title) to a [start, end) row range.
+    """
+    offsets_path = EMBEDDINGS_DIR / f"{prefix}_index_latest.json"
+    if offsets_path.exists():
+        offsets = json.loads(offsets_path.read_text(encoding="utf-8"))
+        if max((end for _, end in offsets.values()), default=0) == len(metadata):
+            return offsets
+    return group_offsets(metadata, key)
+
+QUERIES = [
+    "Meat of bovine animals",
+    "Wheat and meslin",
+    "Silk fabrics",
+    "Passenger motor vehicles",
+    "Medicaments containing antibiotics",
+    "Flat-rolled products of stainless steel",
+    "Mobile phones",
+    "Footwear with rubber soles",
+    "Jewelry of precious metals",
+    "Coffee beans, roasted",
+]
+
+class SearchEngine:
+    """
+    Long-lived search engine over the saved tariff table and chapter note embeddings.
+
+    The `.npy` matrices are loaded once and kept in memory, so a query only
+    costs one encode of the query text instead of re-encoding every row.
+    With `use_ann=True` the tariff rows are searched through the IVF index
+    built by `python -m hts.ann build` instead of a brute-force scan.
+    Tariff row metadata is held in a columnar `rowstore.RowStore`; its rows
+    read like the metadata dicts.
+    """
+    def __init__(self, model_name: str = MODEL_NAME, model: SentenceTransformer = None, use_ann: bool = False):
+        self.model_name = model_name
+        self.model = model or SentenceTransformer(model_name)
+
+        self.notes, note_embs = load_embeddings("chapter_notes", model_name)
+        table_meta, table_embs = load_embeddings("tariff_tables", model_name)
+        self.tables = load_rows(table_meta)
+        del table_meta  # only the compact store is kept
+        # Queries are encoded on the model's device, so the matrices they are
+        # compared against live there too; `table_matrix` stays in host memory
+        # for the numpy scoring paths.
+        device = self.model.device
+        self.table_matrix = normalize(table_embs)
+        self.note_embs = torch.from_numpy(np.ascontiguousarray(note_embs, dtype=np.float32)).to(device)
+        self.table_embs = torch.from_numpy(self.table_matrix).to(device)
+        self.table_texts = self.tables.column("text")
+        self.note_index = load_offsets("chapter_notes", self.notes)
+        self.table_index = IVFIndex.load(index_path("tariff_tables"), table_embs) if use_ann else None
+        self._hts_index = None
+
+    @property
+    def hts_index(self) -> HTSIndex:
+        """HTS number index over the same rows as `self.tables`, built on first use."""
+        if self._hts_index is None:
+            if "indent" in self.tables.columns:
+                self._hts_index = HTSIndex.from_store(self.tables)
+            else:
+                self._hts_index = get_hts_index()
+        return self._hts_index
+
+    def search(self, query: str, top_k: int = 3) -> dict:
+        """Run `hierarchical_search` against the in-memory matrices."""
+        return hierarchical_search(
+            query,
+            self.model,
+            self.notes,
+            self.tables,
+            top_k=top_k,
+            global_table_embs=self.table_embs,
+            global_table_texts=self.table_texts,
+            note_embs=self.note_embs,
+            note_index=self.note_index,
+            table_index=self.table_index,
+        )
+
+    def search_many(self, queries: list[str], k: int = 10, batch_size: int = 256, block_size: int = 1024) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Search many queries against the tariff rows at once.
+
+        All queries are encoded in one batched `model.encode` call and scored
+        with one matrix multiply per block of `block_size` queries (to bound
+        the size of the score matrix). Only the top-k per query is kept,
+        selected with `np.argpartition`.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (n_queries, k) row indices into
+                `self.tables`, best first, and their cosine scores.
+        """
+        q_embs = self.model.encode(queries, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True)
+        return self.score_many(q_embs, k, block_size)
+
+    def score_many(self, q_embs: np.ndarray, k: int = 10, block_size: int = 1024) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k tariff rows for already encoded, unit-length query vectors."""
+        table_embs = self.table_matrix
+        k = min(k, table_embs.shape[0])
+
+        indices = np.empty((len(q_embs), k), dtype=np.int64)
+        scores = np.empty((len(q_embs), k), dtype=np.float32)
+        for start in range(0, len(q_embs), block_size):
+            block = q_embs[start:start + block_size] @ table_embs.T
+            idx = select_top_k(block, k)
+            indices[start:start + block_size] = idx
+            scores[start:start + block_size] = np.take_along_axis(block, idx, axis=1)
+        return indices, scores
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> SearchEngine:
+    """
+    Return the process-wide SearchEngine, loading it on first use. Threads
+    that ask while it is loading wait for that load instead of starting their own.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SearchEngine()
+    return _engine
+
+def search_many(queries: list[str], k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+    """Batched top-k search on the process-wide engine, see `SearchEngine.search_many`."""
+    return get_engine().search_many(queries, k)
+
+_hts_index = None
+_hts_index_lock = threading.Lock()
+
+def get_hts_index() -> HTSIndex:
+    """
+    Return the process-wide HTS number index. Uses the loaded engine's rows
+    when there is one, so looking up a code never loads the encoder.
+    """
+    global _hts_index
+    if _engine is not None and "indent" in _engine.tables.columns:
+        return _engine.hts_index
+    if _hts_index is None:
+        with _hts_index_lock:
+            if _hts_index is None:
+                _hts_index = load_hts_index()
+    return _hts_index
+
+def lookup_hts(code: str, limit: int = 50) -> dict | None:
+    """
+    Exact row, heading path and rows under an HTS code (e.g. "6214.10.1000" or "8703.*").
+    See `HTSIndex.resolve`.
+    """
+    return get_hts_index().resolve(code, limit)
+
 def hierarchical_search(
     query,
     model,
@@ -36,6 +221,9 @@ def hierarchical_search(
     top_k=3,
     global_table_embs=None,
     global_table_texts=None,
+    note_embs=None,
+    note_index=None,
+    table_index=None,
 ):
     """
     Hierarchical semantic search for HTS queries:
@@ -43,6 +231,12 @@ def hierarchical_search(
       2. Find best chapter (with score) using precomputed embeddings
       3. Within chapter: top_k notes and top_k tariff table rows
       4. Across all data: global top tariff table row (uses precomputed embeddings)
+
+    When `note_embs` and `note_index` (chapter title -> [start, end) rows) are
+    given, notes for the top chapters are scored by slicing the precomputed
+    note matrix instead of encoding their texts again. When `table_index`
+    (an `ann.IVFIndex`) is given, the top tariff rows come from the index and
+    `global_table_scores` is None.
     """
     # Encode query once
     q_emb = model.encode(query, convert_to_tensor=True)
@@ -50,27 +244,41 @@ def hierarchical_search(
     # ---------- Step 4: Global Top Tariff Table Row ----------
     global_top_table = None
     all_table_scores = None
-    if global_table_embs is not None and global_table_texts is not None:
+    top_table_idx = None
+    if table_index is not None and global_table_texts is not None:
+        top_table_idx, top_table_scores = table_index.search(q_emb.cpu().numpy(), 10)
+        best_idx, best_score = int(top_table_idx[0]), float(top_table_scores[0])
+    elif global_table_embs is not None and global_table_texts is not None:
         all_table_scores = util.cos_sim(q_emb, global_table_embs)[0].cpu().numpy()
+        top_table_idx = np.argsort(-all_table_scores)[:10]
         best_idx = int(np.argmax(all_table_scores))
+        best_score = float(all_table_scores[best_idx])
+    if top_table_idx is not None:
         global_top_table = {
             "text": global_table_texts[best_idx],
-            "score": float(all_table_scores[best_idx]),
+            "score": best_score,
             "htsno": tables[best_idx].get("htsno"),
             "chapter_title": tables[best_idx].get("chapter_title"),
             "section_title": tables[best_idx].get("section_title"),
         }
 
     notes_for_top_global_tables = []
-    if all_table_scores is not None:
-        top_table_idx = np.argsort(-all_table_scores)[:10]
+    if top_table_idx is not None:
         chapters_in_top_tables = {tables[i]["chapter_title"] for i in top_table_idx if tables[i].get("chapter_title")}
 
-        matching_notes = [n for n in notes if n["chapter_title"] in chapters_in_top_tables]
+        if note_embs is not None and note_index is not None:
+            ranges = sorted(note_index[ch] for ch in chapters_in_top_tables if ch in note_index)
+            rows = [i for start, end in ranges for i in range(start, end)]
+            matching_notes = [notes[i] for i in rows]
+            matching_embs = note_embs[rows] if rows else None
+        else:
+            matching_notes = [n for n in notes if n["chapter_title"] in chapters_in_top_tables]
+            matching_embs = None
         if matching_notes:
             note_texts = [n["text"] for n in matching_notes]
-            note_embs = model.encode(note_texts, convert_to_tensor=True)
-            note_scores = util.cos_sim(q_emb, note_embs)[0].cpu().numpy()
+            if matching_embs is None:
+                matching_embs = model.encode(note_texts, convert_to_tensor=True)
+            note_scores = util.cos_sim(q_emb, matching_embs)[0].cpu().numpy()
             top_note_idx = np.argsort(-note_scores)[:10]
             notes_for_top_global_tables = [
                 {
@@ -295,42 +503,14 @@ def generate_llama_report(output_path, llama_results):
 
 # ---------- Main ----------
 def main():
-    model_name = "all-MiniLM-L6-v2"
-    model = SentenceTransformer(model_name)
-
-    # Load embeddings
-    notes, _ = load_embeddings("chapter_notes")
-    tables, _ = load_embeddings("tariff_tables")
-
-    # Precompute all tariff table embeddings once
-    all_table_texts = [t["text"] for t in tables]
-    all_table_embs = model.encode(all_table_texts, convert_to_tensor=True)
-
-    queries = [
-        "Meat of bovine animals",
-        "Wheat and meslin",
-        "Silk fabrics",
-        "Passenger motor vehicles",
-        "Medicaments containing antibiotics",
-        "Flat-rolled products of stainless steel",
-        "Mobile phones",
-        "Footwear with rubber soles",
-        "Jewelry of precious metals",
-        "Coffee beans, roasted",
-    ]
+    # Load saved embeddings once
+    engine = get_engine()
+    tables = engine.tables
 
     query_results = {}
-    for q in queries:
+    for q in QUERIES:
         start = time.perf_counter()
-        result = hierarchical_search(
-            q,
-            model,
-            notes,
-            tables,
-            top_k=3,
-            global_table_embs=all_table_embs,
-            global_table_texts=all_table_texts,
-        )
+        result = engine.search(q, top_k=3)
         result["time_taken"] = time.perf_counter() - start
         query_results[q] = result
 
@@ -412,25 +592,11 @@ def main():
     generate_llama_report("llama.md", llama_results)
 
 def start_conv(description):
-    model_name = "all-MiniLM-L6-v2"
-    model = SentenceTransformer(model_name)
-
-    # Load embeddings
-    notes, _ = load_embeddings("chapter_notes")
-    tables, _ = load_embeddings("tariff_tables")
-
-    # Precompute all tariff table embeddings once
-    all_table_texts = [t["text"] for t in tables]
-    all_table_embs = model.encode(all_table_texts, convert_to_tensor=True)
-
-    result = hierarchical_search(
-            description,
-            model,
-            notes,
-            tables,
-            global_table_embs=all_table_embs,
-            global_table_texts=all_table_texts,
-        )
+    # Reuse the engine across requests
+    engine = get_engine()
+    tables = engine.tables
+
+    result = engine.search(description)
     
     pipe = load_llama()
 
@@ -0,0 +1,337 @@
+import hashlib, json, sys, time, tracemalloc
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+import numpy as np
+from .encoding import iter_table_rows
+
+EMBEDDINGS_DIR = Path(__file__).resolve().parent / "embeddings"
+STRING_FIELDS = ("text", "htsno", "indent", "general", "special", "other")
+
+class StringTable:
+    """Interned strings: each distinct value is stored once and referred to by an int id (-1 is None)."""
+    def __init__(self, values: list[str] = None):
+        self.values = values or []
+        self._ids = None
+
+    def intern(self, value: str | None) -> int:
+        if value is None:
+            return -1
+        if self._ids is None:
+            self._ids = {v: i for i, v in enumerate(self.values)}
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+    def freeze(self):
+        """Drop the lookup dict once building is done; ids stay valid."""
+        self._ids = None
+
+    def get(self, i: int) -> str | None:
+        return self.values[i] if i >= 0 else None
+
+    def to_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """UTF-8 blob and [n+1] byte offsets, for saving."""
+        encoded = [v.encode("utf-8") for v in self.values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    @classmethod
+    def from_arrays(cls, blob: np.ndarray, offsets: np.ndarray) -> "StringTable":
+        data = blob.tobytes()
+        return cls([data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)])
+
+class RowView(Mapping):
+    """
+    Read-only dict-like view of one row of a RowStore.
+
+    Supports `row["htsno"]`, `row.get("chapter_title")`, `dict(row)` and
+    iteration, like the metadata dicts it replaces. Footnotes (when the store
+    has them) are returned as a list of {"marker", "value"} dicts.
+    """
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: "RowStore", i: int):
+        self._store = store
+        self._i = i
+
+    def __getitem__(self, key):
+        return self._store.value(self._i, key)
+
+    def __iter__(self):
+        return iter(self._store.keys)
+
+    def __len__(self):
+        return len(self._store.keys)
+
+    def __repr__(self):
+        return f"RowView({dict(self)!r})"
+
+class RowStore(Sequence):
+    """
+    Columnar, array-backed store of tariff rows.
+
+    Instead of one dict or `TariffRow` per row, every string field is an
+    int32 column of ids into a shared StringTable, rows point to a chapter id
+    (chapters point to a section id), and footnotes live in flat arrays
+    addressed through a per-row [n+1] offsets array. Indexing returns a
+    RowView that behaves like the old metadata dict; row order is the order
+    of the `tariff_tables` embeddings.
+    """
+    def __init__(self, strings: StringTable, columns: dict[str, np.ndarray], chapter_ids: np.ndarray,
+                 chapter_titles: np.ndarray, chapter_sections: np.ndarray, section_titles: np.ndarray,
+                 footnote_offsets: np.ndarray = None, footnote_markers: np.ndarray = None,
+                 footnote_values: np.ndarray = None):
+        self.strings = strings
+        self.columns = columns
+        self.chapter_ids = chapter_ids
+        self.chapter_titles = chapter_titles
+        self.chapter_sections = chapter_sections
+        self.section_titles = section_titles
+        self.footnote_offsets = footnote_offsets
+        self.footnote_markers = footnote_markers
+        self.footnote_values = footnote_values
+        self.keys = tuple(columns) + ("chapter_title", "section_title") + (("footnotes",) if footnote_offsets is not None else ())
+
+    # ---------- Building ----------
+    @classmethod
+    def build(cls, rows, fields=("text", "htsno"), with_footnotes: bool = False) -> "RowStore":
+        """
+        Build a store from (section_title, chapter_title, values, footnotes) tuples.
+
+        Args:
+            rows (iterable): `values` is a dict holding `fields`; `footnotes` is a
+                list of footnote dicts (ignored unless `with_footnotes`).
+            fields (tuple): String fields to keep as columns.
+            with_footnotes (bool): Whether to keep footnotes.
+        """
+        strings = StringTable()
+        columns = {f: [] for f in fields}
+        chapter_ids, chapter_titles, chapter_sections, section_titles = [], [], [], []
+        chapters, sections = {}, {}
+        fn_offsets, fn_markers, fn_values = [0], [], []
+        for section_title, chapter_title, values, footnotes in rows:
+            if section_title not in sections:
+                sections[section_title] = len(section_titles)
+                section_titles.append(strings.intern(section_title))
+            key = (section_title, chapter_title)
+            if key not in chapters:
+                chapters[key] = len(chapter_titles)
+                chapter_titles.append(strings.intern(chapter_title))
+                chapter_sections.append(sections[section_title])
+            chapter_ids.append(chapters[key])
+            for f in fields:
+                columns[f].append(strings.intern(values.get(f)))
+            if with_footnotes:
+                for fn in footnotes or []:
+                    fn_markers.append(strings.intern(fn.get("marker")))
+                    fn_values.append(strings.intern(fn.get("value")))
+                fn_offsets.append(len(fn_values))
+
+        strings.freeze()
+        i32 = lambda xs: np.asarray(xs, dtype=np.int32)
+        return cls(
+            strings,
+            {f: i32(v) for f, v in columns.items()},
+            i32(chapter_ids), i32(chapter_titles), i32(chapter_sections), i32(section_titles),
+            *((i32(fn_offsets), i32(fn_markers), i32(fn_values)) if with_footnotes else ()),
+        )
+
+    @classmethod
+    def from_metadata(cls, metadata: list[dict]) -> "RowStore":
+        """Build from `tariff_tables_metadata_latest.json` dicts (text, htsno, chapter and section titles)."""
+        return cls.build((m.get("section_title"), m.get("chapter_title"), m, None) for m in metadata)
+
+    @classmethod
+    def from_hts(cls, json_path: str | Path = "data/hts/hts_full_latest.json") -> "RowStore":
+        """Build from the combined schedule with rates, indent and footnotes, in embedding row order."""
+        data = json.loads(Path(json_path).read_text(encoding="utf-8"))
+        rows = (
+            (section_title, chapter_title, {**row, "text": row["description"].strip()}, row.get("footnotes"))
+            for section_title, chapter_title, row in iter_table_rows(data)
+        )
+        return cls.build(rows, fields=STRING_FIELDS, with_footnotes=True)
+
+    # ---------- Access ----------
+    def __len__(self):
+        return len(self.chapter_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [RowView(self, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return RowView(self, i)
+
+    def value(self, i: int, key: str):
+        """Value of field `key` for row `i` (KeyError for unknown fields)."""
+        if key in self.columns:
+            return self.strings.get(int(self.columns[key][i]))
+        if key == "chapter_title":
+            return self.strings.get(int(self.chapter_titles[self.chapter_ids[i]]))
+        if key == "section_title":
+            section = self.chapter_sections[self.chapter_ids[i]]
+            return self.strings.get(int(self.section_titles[section]))
+        if key == "footnotes" and self.footnote_offsets is not None:
+            start, end = self.footnote_offsets[i], self.footnote_offsets[i + 1]
+            return [
+                {"marker": self.strings.get(int(m)), "value": self.strings.get(int(v))}
+                for m, v in zip(self.footnote_markers[start:end], self.footnote_values[start:end])
+            ]
+        raise KeyError(key)
+
+    def column(self, key: str) -> list:
+        """Whole column as a list of Python values (strings are shared, not copied)."""
+        if key in self.columns:
+            values = self.strings.values
+            return [values[i] if i >= 0 else None for i in self.columns[key].tolist()]
+        return [self.value(i, key) for i in range(len(self))]
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by the arrays and the string table."""
+        arrays = [*self.columns.values(), self.chapter_ids, self.chapter_titles, self.chapter_sections, self.section_titles]
+        arrays += [a for a in (self.footnote_offsets, self.footnote_markers, self.footnote_values) if a is not None]
+        return sum(a.nbytes for a in arrays) + sum(sys.getsizeof(v) for v in self.strings.values)
+
+    def fingerprint(self) -> str:
+        """Hash of the fields the embedding metadata also holds; see `metadata_fingerprint`."""
+        keys = ("text", "htsno", "chapter_title", "section_title")
+        return _fingerprint(zip(*(self.column(k) for k in keys)))
+
+    # ---------- Persistence ----------
+    def save(self, path: str | Path, **meta):
+        """Save the arrays to an `.npz` file; `meta` is stored as JSON next to the row fingerprint."""
+        blob, offsets = self.strings.to_arrays()
+        arrays = {f"col_{k}": v for k, v in self.columns.items()}
+        if self.footnote_offsets is not None:
+            arrays.update(fn_offsets=self.footnote_offsets, fn_markers=self.footnote_markers, fn_values=self.footnote_values)
+        np.savez(
+            path, strings=blob, string_offsets=offsets, chapter_ids=self.chapter_ids,
+            chapter_titles=self.chapter_titles, chapter_sections=self.chapter_sections,
+            section_titles=self.section_titles, **arrays,
+            meta=np.array(json.dumps({"fingerprint": self.fingerprint(), **meta})),
+        )
+
+    @staticmethod
+    def load_meta(path: str | Path) -> dict:
+        """The JSON meta saved with a store (empty for files written before it existed)."""
+        with np.load(path) as z:
+            return json.loads(str(z["meta"])) if "meta" in z.files else {}
+
+    @classmethod
+    def load(cls, path: str | Path) -> "RowStore":
+        with np.load(path) as z:
+            columns = {k[4:]: z[k] for k in z.files if k.startswith("col_")}
+            footnotes = (z["fn_offsets"], z["fn_markers"], z["fn_values"]) if "fn_offsets" in z.files else ()
+            return cls(
+                StringTable.from_arrays(z["strings"], z["string_offsets"]), columns,
+                z["chapter_ids"], z["chapter_titles"], z["chapter_sections"], z["section_titles"], *footnotes,
+            )
+
+def _fingerprint(rows) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        h.update(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+def metadata_fingerprint(metadata: list[dict]) -> str:
+    """Hash of the text, htsno, chapter and section title of every metadata row, in order."""
+    return _fingerprint((m.get("text"), m.get("htsno"), m.get("chapter_title"), m.get("section_title")) for m in metadata)
+
+def embeddings_version(prefix: str = "tariff_tables") -> str | None:
+    """`version` of the embeddings in `{prefix}_info_latest.json`, if there is one."""
+    info_path = EMBEDDINGS_DIR / f"{prefix}_info_latest.json"
+    return json.loads(info_path.read_text(encoding="utf-8")).get("version") if info_path.exists() else None
+
+def rows_path(prefix: str = "tariff_tables", version: str = "latest") -> Path:
+    return EMBEDDINGS_DIR / f"{prefix}_rows_{version}.npz"
+
+def load_rows(metadata: list[dict], prefix: str = "tariff_tables") -> RowStore:
+    """
+    RowStore for a prefix: the saved `{prefix}_rows_latest.npz` when it was
+    built for the current embeddings, otherwise one built from the metadata
+    dicts (text and htsno only).
+
+    The saved store must have the metadata's fingerprint (same texts, codes
+    and titles in the same order) and the embeddings `version` it was built
+    against, so a store left over from an earlier release, whose rates could
+    differ even where the descriptions match, is not served next to newer
+    embeddings.
+    """
+    path = rows_path(prefix)
+    if path.exists():
+        meta = RowStore.load_meta(path)
+        if meta.get("version") == embeddings_version(prefix) and meta.get("fingerprint") == metadata_fingerprint(metadata):
+            return RowStore.load(path)
+        print(f"{path.name} does not match the current embeddings; using the metadata rows "
+              f"(rebuild with `python -m hts.rowstore build`)")
+    return RowStore.from_metadata(metadata)
+
+def _measure(build) -> tuple[object, int, float]:
+    """Build something under tracemalloc; returns (result, bytes still held, seconds)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - t0
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+def benchmark(output_path: str = "rowstore_benchmark.md"):
+    """
+    Compare the memory held by the tariff rows in each representation:
+    the metadata dicts, the `TariffRow` object graph from `hts_full_latest.json`,
+    and RowStores built from each.
+    """
+    from .src.models import TariffRow
+    meta_path = EMBEDDINGS_DIR / "tariff_tables_metadata_latest.json"
+    hts_path = Path("data/hts/hts_full_latest.json")
+    load_meta = lambda: json.loads(meta_path.read_text(encoding="utf-8"))
+    load_hts = lambda: json.loads(hts_path.read_text(encoding="utf-8"))
+    results = []
+
+    # Each representation is built from the file inside the measurement, so
+    # temporaries are freed and only what the representation keeps is counted
+    for name, build in (
+        ("Metadata dicts (json)", load_meta),
+        ("TariffRow object graph", lambda: [TariffRow.model_validate(r) for _, _, r in iter_table_rows(load_hts())]),
+        ("RowStore from metadata", lambda: RowStore.from_metadata(load_meta())),
+        ("RowStore from hts_full", lambda: RowStore.from_hts(hts_path)),
+    ):
+        rows, held, t = _measure(build)
+        results.append((name, len(rows), held, t))
+        del rows
+
+    baseline = results[0][2]
+    lines = [
+        "# Benchmarks – Tariff Row Memory\n\n",
+        "Memory still allocated (tracemalloc) after loading the tariff rows in each representation.  \n",
+        "The metadata dicts are what `query.py` held before; the object graph is one `TariffRow` per row. "
+        "RowStore from hts_full also keeps rates, indent and footnotes.\n\n",
+        "| Representation           | Rows   | Memory (MB) | vs dicts | Load(s) |\n",
+        "|--------------------------|--------|-------------|----------|---------|\n",
+    ]
+    for name, rows, held, t in results:
+        lines.append(f"| {name:<24} | {rows:6d} | {held / 1024 / 1024:11.1f} | {held / baseline:7.2f}x | {t:7.2f} |\n")
+    Path(output_path).write_text("".join(lines), encoding="utf-8")
+    print(f"Benchmarks written to {output_path}")
+
+def main(argv=None):
+    """Usage: python -m hts.rowstore [build | benchmark]"""
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "build"
+    if command == "build":
+        store = RowStore.from_hts()
+        store.save(rows_path(), version=embeddings_version())
+        print(f"{len(store)} rows, {store.nbytes() / 1024 / 1024:.1f} MB -> {rows_path()}")
+    elif command == "benchmark":
+        benchmark()
+    else:
+        raise SystemExit(main.__doc__)
+
+if __name__ == "__main__":
+    main()
@@ -65,7 +65,7 @@ def get_file_stats(directory):
     if not p.exists():
         return 0, 0, 0, 0, 0
     for f in p.glob("*"):
-        if f.is_file():
+        if f.is_file() and f.name != "cache_index.json":
             sizes.append(f.stat().st_size)
     if not sizes:
         return 0, 0, 0, 0, 0
@@ -209,6 +209,19 @@ for line in structured_projected:
 
 report_lines.append(f"\n- **Total:** {sizeof_fmt(total_bytes)}")
 
+# --- Versioned outputs kept in the object store ---
+from src.store import ObjectStore
+store = ObjectStore().footprint()
+if store["refs"]:
+    report_lines.append("\n## Versioned Storage (deduplicated)\n")
+    report_lines.append(f"- Files tracked (latest + dated): {store['refs']}")
+    report_lines.append(f"- Logical Size (one full copy per file): {sizeof_fmt(store['logical'])}")
+    report_lines.append(f"- Distinct Versions: {store['objects']} ({sizeof_fmt(store['objects_bytes'])})")
+    report_lines.append(f"- Distinct Chunks: {store['chunks']} ({sizeof_fmt(store['chunks_raw'])} raw, "
+                        f"{sizeof_fmt(store['chunks_stored'])} compressed)")
+    report_lines.append(f"- Working Files on Disk: {sizeof_fmt(store['working'])}")
+    report_lines.append(f"- Deduplication Ratio: {calc_ratio(store['chunks_stored'], store['logical']):.2f}")
+
 # ---------- Write to Markdown ----------
 output_file = "size_report.md"
 with open(output_file, "w", encoding="utf-8") as f:
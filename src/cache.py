@@ -0,0 +1,142 @@
+import hashlib, json, os, threading
+from pathlib import Path
+from .utils import get_retry
+from .store import link_or_copy
+
+def sha256_bytes(data: bytes) -> str:
+    """Hex SHA-256 digest of a byte string."""
+    return hashlib.sha256(data).hexdigest()
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Hex SHA-256 digest of a file, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class DownloadCache:
+    """
+    Content-addressed local cache for downloaded PDFs and JSON exports.
+
+    Each download is stored once under `blobs/<sha256><suffix>` and the usual
+    file name (e.g. `chapter_5.pdf`) is a hardlink to that blob. Bodies are
+    streamed to disk, so large exports are never held in memory. An index
+    file keeps, per key, the blob hash, the release and the ETag /
+    Last-Modified validators returned by the server.
+
+    Freshness rules:
+        - A key already confirmed during this process is reused with no request,
+          so the section, chapter and additional-notes passes share one download.
+        - A pinned release (anything but "currentRelease") never changes, so a
+          cached blob for it is reused with no request.
+        - Otherwise a conditional GET is sent; a 304 reuses the cached blob.
+    """
+    def __init__(self, root: str | Path, suffix: str = ".pdf"):
+        self.root = Path(root)
+        self.suffix = suffix
+        self.blob_dir = self.root / "blobs"
+        self.index_path = self.root / "cache_index.json"
+        self._lock = threading.Lock()
+        self._fresh = set()
+        self.index = json.loads(self.index_path.read_text(encoding="utf-8")) if self.index_path.exists() else {}
+        self.stats = {"hits": 0, "revalidated": 0, "downloads": 0}
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blob_dir / f"{digest}{self.suffix}"
+
+    def _save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.index, indent=2), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def digest(self, key: str) -> str | None:
+        """SHA-256 of the cached bytes for `key`, if any."""
+        entry = self.index.get(key)
+        return entry["sha256"] if entry else None
+
+    def _cached(self, key: str, release: str) -> dict | None:
+        entry = self.index.get(key)
+        if entry and entry.get("release") == release and self.blob_path(entry["sha256"]).exists():
+            return entry
+        return None
+
+    def fetch(self, key: str, url: str, dest: str | Path, release: str = "currentRelease", **kwargs) -> Path:
+        """
+        Return `dest` holding the current bytes for `url`, downloading only when needed.
+
+        Args:
+            key (str): Stable cache key (e.g. 'chapter_5').
+            url (str): Download URL.
+            dest (str | Path): Path the caller expects the file at.
+            release (str): HTS release the URL points to.
+            **kwargs: Passed to `get_retry` (e.g. params).
+        Returns:
+            Path: `dest`.
+        """
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._cached(key, release)
+
+        if entry and (key in self._fresh or release != "currentRelease"):
+            with self._lock:
+                self.stats["hits"] += 1
+            return self._place(entry, dest)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        # Closing the streamed response frees its host limiter slot, so every path closes it
+        r = get_retry(url, headers=headers, stream=True, **kwargs)
+        if r.status_code == 304 and entry:
+            r.close()
+            with self._lock:
+                self.stats["revalidated"] += 1
+                self._fresh.add(key)
+            return self._place(entry, dest)
+        if not r.ok:
+            r.close()
+            r.raise_for_status()
+
+        # Stream the body to a temp file while hashing, then move it to its blob name
+        h = hashlib.sha256()
+        size = 0
+        tmp = self.blob_dir / f"{key}.{threading.get_ident()}.part"
+        with r, open(tmp, "wb") as f:
+            for chunk in r.iter_content(chunk_size=1 << 16):
+                h.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        digest = h.hexdigest()
+        blob = self.blob_path(digest)
+        if blob.exists():
+            tmp.unlink()
+        else:
+            os.replace(tmp, blob)
+
+        entry = {
+            "sha256": digest,
+            "release": release,
+            "url": url,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "size": size,
+        }
+        with self._lock:
+            self.stats["downloads"] += 1
+            self.index[key] = entry
+            self._fresh.add(key)
+            self._save_index()
+        return self._place(entry, dest)
+
+    def _place(self, entry: dict, dest: Path) -> Path:
+        blob = self.blob_path(entry["sha256"])
+        if not (dest.exists() and os.path.samefile(dest, blob)):
+            link_or_copy(blob, dest)
+        return dest
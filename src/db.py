@@ -0,0 +1,494 @@
+import json, os, sqlite3, sys, time
+from pathlib import Path
+
+DB_PATH = Path("data/hts.db")
+HTS_PATH = Path("data/hts/hts_full_latest.json")
+RULES_PATH = Path("data/rules/general_rules_latest.json")
+
+# Tariff row fields and the columns holding them
+ROW_COLUMNS = {
+    "htsno": "htsno",
+    "indent": "indent",
+    "description": "description",
+    "superior": "superior",
+    "units": "units",
+    "general": "general",
+    "special": "special",
+    "other": "other",
+    "quotaQuantity": "quota_quantity",
+    "additionalDuties": "additional_duties",
+}
+JSON_COLUMNS = {"units", "sub_items", "columns"}
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE sections (
+    sec_number TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE chapters (
+    ch_number TEXT PRIMARY KEY,
+    sec_number TEXT NOT NULL REFERENCES sections(sec_number),
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE rows (
+    id INTEGER PRIMARY KEY,
+    sec_number TEXT NOT NULL,
+    ch_number TEXT NOT NULL REFERENCES chapters(ch_number),
+    position INTEGER NOT NULL,
+    htsno TEXT,
+    indent TEXT,
+    description TEXT NOT NULL,
+    superior TEXT,
+    units TEXT,
+    general TEXT,
+    special TEXT,
+    other TEXT,
+    quota_quantity TEXT,
+    additional_duties TEXT
+);
+CREATE TABLE footnotes (
+    row_id INTEGER NOT NULL REFERENCES rows(id),
+    position INTEGER NOT NULL,
+    columns TEXT,
+    marker TEXT,
+    value TEXT NOT NULL,
+    type TEXT
+);
+CREATE TABLE notes (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,          -- general / section / chapter / additional
+    owner TEXT,                  -- section or chapter number (NULL for general notes)
+    position INTEGER NOT NULL,
+    note_number TEXT,
+    title TEXT,
+    text TEXT NOT NULL,
+    sub_items TEXT
+);
+CREATE TABLE rules (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,          -- general_rules / additional_rules
+    position INTEGER NOT NULL,
+    rule_number TEXT,
+    text TEXT,
+    sub_items TEXT
+);
+"""
+
+INDEXES = """
+CREATE INDEX rows_htsno ON rows(htsno);
+CREATE INDEX rows_chapter ON rows(ch_number, position);
+CREATE INDEX rows_section ON rows(sec_number);
+CREATE INDEX chapters_section ON chapters(sec_number, position);
+CREATE INDEX footnotes_row ON footnotes(row_id, position);
+CREATE INDEX notes_owner ON notes(kind, owner, position);
+CREATE VIRTUAL TABLE rows_fts USING fts5(description, content='rows', content_rowid='id', tokenize='porter unicode61');
+INSERT INTO rows_fts(rowid, description) SELECT id, description FROM rows;
+CREATE VIRTUAL TABLE notes_fts USING fts5(title, body, tokenize='porter unicode61');
+"""
+
+def flatten_text(item) -> str:
+    """All text of a note or rule, including nested `sub_items`, as one string."""
+    if isinstance(item, str):
+        return item
+    if not isinstance(item, dict):
+        return ""
+    parts = [item.get("label") or "", item.get("text") or ""]
+    parts += [flatten_text(s) for s in item.get("sub_items") or []]
+    return " ".join(p for p in parts if p)
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False) if value is not None else None
+
+def build(db_path: str | Path = DB_PATH, hts_path: str | Path = HTS_PATH, rules_path: str | Path = RULES_PATH) -> dict:
+    """
+    Build the SQLite store from the combined schedule and the general rules.
+
+    The database is written to a temporary file and renamed over `db_path`,
+    so readers never see a half-built store. Indexes and the FTS5 tables are
+    created after the bulk insert, which is much faster than maintaining
+    them row by row. A section or chapter listed more than once in the TOC
+    is stored once, from its first occurrence, like `utils.deduplicate`;
+    new chapters under a repeated section are still added.
+
+    Args:
+        db_path (str | Path): Output database.
+        hts_path (str | Path): `hts_full` JSON written by `combine()`.
+        rules_path (str | Path): General rules JSON (skipped if missing).
+    Returns:
+        dict: Row counts per table and the build time in seconds.
+    """
+    db_path, hts_path, rules_path = Path(db_path), Path(hts_path), Path(rules_path)
+    if not hts_path.exists():
+        raise FileNotFoundError(f"{hts_path} not found; run ingesting.py first")
+    t0 = time.perf_counter()
+    data = json.loads(hts_path.read_bytes())
+
+    tmp_path = db_path.with_suffix(db_path.suffix + ".tmp")
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+        notes = []  # (kind, owner, position, note_number, title, text, sub_items)
+
+        for i, note in enumerate(data.get("general_notes") or []):
+            notes.append(("general", None, i, note.get("note_number"), note.get("title"), note.get("text") or "", note.get("sub_items")))
+
+        row_id = 0
+        seen_sections, seen_chapters = set(), set()
+        for s_pos, section in enumerate(data.get("sections") or []):
+            sec = section["sec_number"]
+            if sec not in seen_sections:
+                seen_sections.add(sec)
+                conn.execute("INSERT INTO sections VALUES (?, ?, ?)", (sec, s_pos, section.get("title") or ""))
+                for i, note in enumerate((section.get("notes") or {}).get("notes") or []):
+                    notes.append(("section", sec, i, note.get("note_number"), None, note.get("text") or "", note.get("sub_items")))
+
+            for c_pos, chapter in enumerate(section.get("chapters") or []):
+                ch = chapter["ch_number"]
+                if ch in seen_chapters:
+                    continue
+                seen_chapters.add(ch)
+                conn.execute("INSERT INTO chapters VALUES (?, ?, ?, ?)", (ch, sec, c_pos, chapter.get("title") or ""))
+                for kind, key in (("chapter", "notes"), ("additional", "additional")):
+                    for i, note in enumerate((chapter.get(key) or {}).get("notes") or []):
+                        notes.append((kind, ch, i, note.get("note_number"), None, note.get("text") or "", note.get("sub_items")))
+
+                rows, footnotes = [], []
+                for r_pos, row in enumerate((chapter.get("table") or {}).get("rows") or []):
+                    row_id += 1
+                    values = [row.get(field) for field in ROW_COLUMNS]
+                    values[2] = values[2] or ""
+                    values[4] = _json(values[4])
+                    rows.append((row_id, sec, ch, r_pos, *values))
+                    for f_pos, fn in enumerate(row.get("footnotes") or []):
+                        footnotes.append((row_id, f_pos, _json(fn.get("columns")), fn.get("marker"), fn.get("value") or "", fn.get("type")))
+                conn.executemany(f"INSERT INTO rows VALUES ({', '.join('?' * (4 + len(ROW_COLUMNS)))})", rows)
+                conn.executemany("INSERT INTO footnotes VALUES (?, ?, ?, ?, ?, ?)", footnotes)
+
+        conn.executemany(
+            "INSERT INTO notes (kind, owner, position, note_number, title, text, sub_items) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(*n[:6], _json(n[6])) for n in notes],
+        )
+
+        if rules_path.exists():
+            rules = json.loads(rules_path.read_bytes())
+            for kind in ("general_rules", "additional_rules"):
+                conn.executemany(
+                    "INSERT INTO rules (kind, position, rule_number, text, sub_items) VALUES (?, ?, ?, ?, ?)",
+                    [(kind, i, r.get("rule_number"), r.get("text"), _json(r.get("sub_items")))
+                     for i, r in enumerate(rules.get(kind) or [])],
+                )
+
+        conn.executescript(INDEXES)
+        conn.executemany(
+            "INSERT INTO notes_fts(rowid, title, body) VALUES (?, ?, ?)",
+            ((nid, title or "", flatten_text({"text": text, "sub_items": json.loads(sub) if sub else None}))
+             for nid, title, text, sub in conn.execute("SELECT id, title, text, sub_items FROM notes").fetchall()),
+        )
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("source", str(hts_path)),
+            ("source_mtime", str(hts_path.stat().st_mtime)),
+        ])
+        conn.commit()
+        counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                  for t in ("sections", "chapters", "rows", "footnotes", "notes", "rules")}
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    counts["seconds"] = time.perf_counter() - t0
+    return counts
+
+def fts_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 query matching every word.
+
+    Each word is quoted, so punctuation and FTS operators in user input
+    (`-`, `:`, `"`, `AND`) are searched for literally instead of raising a
+    syntax error.
+    """
+    words = [w.replace('"', '""') for w in text.split()]
+    return " ".join(f'"{w}"' for w in words if w.strip('"'))
+
+class HTSDatabase:
+    """
+    Read-only access to the SQLite store built by `build`.
+
+    Every method runs an indexed query and returns plain dicts shaped like
+    the JSON records, so callers fetch only the rows they need instead of
+    loading the whole schedule. Usable as a context manager.
+
+    Args:
+        path (str | Path): Database file. Defaults to `data/hts.db`.
+    """
+    def __init__(self, path: str | Path = DB_PATH):
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"{path} not found; run `python -m src.db build`")
+        self.path = path
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _record(row: sqlite3.Row, rename: dict = None) -> dict:
+        out = {}
+        for key in row.keys():
+            value = row[key]
+            if key in JSON_COLUMNS and value is not None:
+                value = json.loads(value)
+            out[(rename or {}).get(key, key)] = value
+        return out
+
+    def _rows(self, where: str, params: tuple, with_footnotes: bool = True, fields: tuple = None) -> list[dict]:
+        columns = [ROW_COLUMNS[f] for f in fields] if fields else list(ROW_COLUMNS.values())
+        select = ", ".join(["id", "sec_number", "ch_number", *columns])
+        rename = {v: k for k, v in ROW_COLUMNS.items()}
+        records = [self._record(r, rename) for r in self.conn.execute(f"SELECT {select} FROM rows WHERE {where}", params)]
+        if with_footnotes and records:
+            by_id = {r["id"]: r for r in records}
+            for r in records:
+                r["footnotes"] = []
+            placeholders = ", ".join("?" * len(by_id))
+            for fn in self.conn.execute(
+                f"SELECT row_id, columns, marker, value, type FROM footnotes WHERE row_id IN ({placeholders}) ORDER BY row_id, position",
+                tuple(by_id),
+            ):
+                rec = self._record(fn)
+                by_id[rec.pop("row_id")]["footnotes"].append(rec)
+        return records
+
+    def row(self, htsno: str) -> dict | None:
+        """The tariff row for an HTS number (first match), with footnotes."""
+        rows = self._rows("htsno = ? ORDER BY id LIMIT 1", (htsno,))
+        return rows[0] if rows else None
+
+    def chapter_rows(self, ch_number: str | int, with_footnotes: bool = True) -> list[dict]:
+        """All tariff rows of one chapter, in table order."""
+        return self._rows("ch_number = ? ORDER BY position", (str(ch_number),), with_footnotes)
+
+    def section_rows(self, sec_number: str, with_footnotes: bool = False) -> list[dict]:
+        """All tariff rows of one section, in schedule order."""
+        return self._rows("sec_number = ? ORDER BY id", (sec_number,), with_footnotes)
+
+    def chapter(self, ch_number: str | int) -> dict | None:
+        """Chapter number, title and section."""
+        row = self.conn.execute("SELECT ch_number, sec_number, title FROM chapters WHERE ch_number = ?", (str(ch_number),)).fetchone()
+        return dict(row) if row else None
+
+    def sections(self) -> list[dict]:
+        """Section numbers and titles, in schedule order."""
+        return [dict(r) for r in self.conn.execute("SELECT sec_number, title FROM sections ORDER BY position")]
+
+    def chapters(self, sec_number: str = None) -> list[dict]:
+        """Chapters of one section (or all of them), in schedule order."""
+        sql = "SELECT c.ch_number, c.sec_number, c.title FROM chapters c JOIN sections s USING (sec_number)"
+        params = ()
+        if sec_number is not None:
+            sql += " WHERE c.sec_number = ?"
+            params = (sec_number,)
+        return [dict(r) for r in self.conn.execute(sql + " ORDER BY s.position, c.position", params)]
+
+    def notes(self, kind: str, owner: str | int = None) -> list[dict]:
+        """
+        Notes of one kind (`general`, `section`, `chapter` or `additional`), optionally for one section / chapter.
+        """
+        sql = "SELECT note_number, title, text, sub_items FROM notes WHERE kind = ?"
+        params = (kind,)
+        if owner is not None:
+            sql += " AND owner = ?"
+            params += (str(owner),)
+        records = [self._record(r) for r in self.conn.execute(sql + " ORDER BY owner, position", params)]
+        if kind != "general":
+            for r in records:
+                del r["title"]
+        return records
+
+    def rules(self, kind: str = "general_rules") -> list[dict]:
+        """General (or additional) rules of interpretation, in order."""
+        sql = "SELECT rule_number, text, sub_items FROM rules WHERE kind = ? ORDER BY position"
+        return [self._record(r) for r in self.conn.execute(sql, (kind,))]
+
+    def search_rows(self, query: str, limit: int = 20, raw: bool = False) -> list[dict]:
+        """
+        Keyword search over tariff row descriptions, best matches first (BM25).
+
+        Args:
+            query (str): Words to match; all must appear (stemmed).
+            limit (int): Maximum rows returned.
+            raw (bool): Pass `query` to FTS5 unchanged (allows `OR`, `NEAR`, prefix `*`).
+        Returns:
+            list[dict]: Rows with `htsno`, `description`, `ch_number`, `sec_number` and `score`.
+        """
+        match = query if raw else fts_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT r.id, r.htsno, r.description, r.ch_number, r.sec_number, bm25(rows_fts) AS score "
+            "FROM rows_fts JOIN rows r ON r.id = rows_fts.rowid WHERE rows_fts MATCH ? ORDER BY score LIMIT ?"
+        )
+        return [dict(r) for r in self.conn.execute(sql, (match, limit))]
+
+    def search_notes(self, query: str, limit: int = 20, raw: bool = False) -> list[dict]:
+        """
+        Keyword search over note text (including sub-items), best matches first.
+
+        Returns:
+            list[dict]: Notes with `kind`, `owner`, `note_number`, a text `snippet` and `score`.
+        """
+        match = query if raw else fts_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT n.id, n.kind, n.owner, n.note_number, snippet(notes_fts, 1, '[', ']', '…', 16) AS snippet, "
+            "bm25(notes_fts) AS score FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid "
+            "WHERE notes_fts MATCH ? ORDER BY score LIMIT ?"
+        )
+        return [dict(r) for r in self.conn.execute(sql, (match, limit))]
+
+    def schedule(self, include: tuple = ("notes", "table"), row_fields: tuple = ("htsno", "description")) -> dict:
+        """
+        The schedule in the shape of `hts_full`, holding only the parts asked for.
+
+        Lets loaders written against the combined JSON (e.g.
+        `encoding.load_texts`) read from the database without pulling in
+        footnotes, rates or notes they do not use.
+
+        Args:
+            include (tuple): Any of `general_notes`, `section_notes`, `notes`
+                (chapter notes), `additional` and `table`.
+            row_fields (tuple): Tariff row fields to load; None for all.
+                Footnotes are left out (see `row` / `chapter_rows`).
+        Returns:
+            dict: {"general_notes": [...], "sections": [...]}
+        """
+        data = {"general_notes": self.notes("general") if "general_notes" in include else [], "sections": []}
+        notes_by_owner = {}
+        for kind in ("section", "chapter", "additional"):
+            key = {"section": "section_notes", "chapter": "notes"}.get(kind, kind)
+            if key not in include:
+                continue
+            sql = "SELECT owner, note_number, text, sub_items FROM notes WHERE kind = ? ORDER BY owner, position"
+            for r in self.conn.execute(sql, (kind,)):
+                rec = self._record(r)
+                notes_by_owner.setdefault((kind, rec.pop("owner")), []).append(rec)
+
+        rows_by_chapter = {}
+        if "table" in include:
+            for r in self._rows("1 ORDER BY id", (), with_footnotes=False, fields=row_fields):
+                del r["id"], r["sec_number"]
+                rows_by_chapter.setdefault(r.pop("ch_number"), []).append(r)
+
+        sections = {}
+        for s in self.sections():
+            sec = s["sec_number"]
+            notes = notes_by_owner.get(("section", sec))
+            sections[sec] = {
+                "sec_number": sec,
+                "title": s["title"],
+                "notes": {"section_number": sec, "notes": notes} if notes else None,
+                "chapters": [],
+            }
+            data["sections"].append(sections[sec])
+        for c in self.chapters():
+            ch = c["ch_number"]
+            notes, additional, rows = (notes_by_owner.get(("chapter", ch)), notes_by_owner.get(("additional", ch)),
+                                       rows_by_chapter.get(ch))
+            sections[c["sec_number"]]["chapters"].append({
+                "ch_number": ch,
+                "title": c["title"],
+                "notes": {"chapter_number": ch, "notes": notes} if notes else None,
+                "additional": {"chapter_number": ch, "notes": additional} if additional else None,
+                "table": {"chapter_number": ch, "rows": rows} if rows else None,
+            })
+        return data
+
+def benchmark(queries: list[str], db_path: str | Path = DB_PATH, hts_path: str | Path = HTS_PATH,
+              output_path: str = "db_benchmark.md", repeat: int = 20):
+    """
+    Compare keyword lookups in the SQLite store against loading `hts_full`
+    and scanning every row description, and write the timings to Markdown.
+    """
+    hts_path = Path(hts_path)
+
+    t0 = time.perf_counter()
+    data = json.loads(hts_path.read_bytes())
+    descriptions = [(row.get("htsno"), (row.get("description") or "").lower())
+                    for s in data["sections"] for c in s.get("chapters") or []
+                    for row in (c.get("table") or {}).get("rows") or []]
+    json_load = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    db = HTSDatabase(db_path)
+    db_open = time.perf_counter() - t0
+    with db:
+        lines = [
+            "# Benchmarks – SQLite Store\n\n",
+            f"Keyword lookups over {len(descriptions)} tariff rows. Loading `{hts_path}` and extracting the row "
+            f"descriptions takes {json_load:.3f} s; opening `{db_path}` takes {db_open * 1000:.2f} ms. "
+            f"Lookup times are the median of {repeat} runs.\n\n",
+            "| Query                          | Hits (FTS5) | FTS5 (ms) | JSON scan (ms) | `row(htsno)` (ms) |\n",
+            "|--------------------------------|-------------|-----------|----------------|-------------------|\n",
+        ]
+        for q in queries:
+            words = q.lower().split()
+            fts_times, scan_times, row_times = [], [], []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                hits = db.search_rows(q, limit=20)
+                fts_times.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                scan = [h for h, d in descriptions if all(w in d for w in words)][:20]
+                scan_times.append(time.perf_counter() - t0)
+                htsno = hits[0]["htsno"] if hits else (scan[0] if scan else None)
+                t0 = time.perf_counter()
+                if htsno:
+                    db.row(htsno)
+                row_times.append(time.perf_counter() - t0)
+            med = lambda xs: sorted(xs)[len(xs) // 2] * 1000
+            lines.append(f"| {q[:30]:<30} | {len(hits):11d} | {med(fts_times):9.3f} | {med(scan_times):14.3f} | {med(row_times):17.3f} |\n")
+
+    Path(output_path).write_text("".join(lines), encoding="utf-8")
+    print(f"Benchmarks written to {output_path}")
+
+def main(argv=None):
+    """
+    Usage:
+        python -m src.db build                 # data/hts.db from hts_full + general rules
+        python -m src.db search WORDS...       # keyword search over rows and notes
+        python -m src.db benchmark [QUERY...]  # writes db_benchmark.md
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    cmd = argv[0] if argv else "build"
+    if cmd == "build":
+        counts = build()
+        seconds = counts.pop("seconds")
+        print(f"Built {DB_PATH} in {seconds:.2f}s: " + ", ".join(f"{n} {t}" for t, n in counts.items()))
+    elif cmd == "search":
+        query = " ".join(argv[1:])
+        with HTSDatabase() as db:
+            for r in db.search_rows(query, limit=10):
+                print(f"{r['htsno'] or '':<14} ch {r['ch_number']:<3} {r['description']}")
+            for n in db.search_notes(query, limit=5):
+                print(f"[{n['kind']} note {n['owner'] or ''} {n['note_number'] or ''}] {n['snippet']}")
+    elif cmd == "benchmark":
+        benchmark(argv[1:] or ["live horses", "frozen fish fillets", "wool yarn", "steel screws", "lithium batteries"])
+    else:
+        print(main.__doc__)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import hashlib, json, re, sys, time
+from pathlib import Path
+from .models import TariffRow
+from .shards import MANIFEST_NAME, dump_compact
+from .store import default_store
+
+HTS_DIR = Path("data/hts")
+CHANGES_PATH = HTS_DIR / "changes_latest.json"
+ROW_FIELDS = tuple(TariffRow.model_fields)
+NOTE_FIELDS = ("title", "text", "sub_items")
+
+def resolve_source(source: str | Path) -> Path:
+    """
+    Path of a release: "latest", a date ("2025-09-25") for the dated
+    `hts_full` of that day, or any hts_full file / shard directory.
+    """
+    source = str(source)
+    if source == "latest":
+        return HTS_DIR / "hts_full_latest.json"
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", source):
+        return HTS_DIR / f"hts_full_v{source}.json"
+    return Path(source)
+
+class Release:
+    """
+    One HTS release, opened for diffing.
+
+    Every chapter gets the SHA-256 of its compact JSON (the hash
+    `src.shards` keeps in its manifest), so chapters that are identical in
+    two releases are skipped without looking at their rows. A shard
+    directory is read through its manifest and only the shards of chapters
+    that differ are opened. Dated files no longer on disk are read from the
+    object store (`src.store`).
+
+    Args:
+        source (str | Path): See `resolve_source`.
+    """
+    def __init__(self, source: str | Path):
+        path = resolve_source(source)
+        self.label = str(source)
+        self.root = None
+        if path.is_dir():
+            self.root = path
+            manifest = json.loads((path / MANIFEST_NAME).read_bytes())
+            self.sections = manifest["sections"]
+            self.general_entry = manifest["general_notes"]
+            self.general_hash = self.general_entry["sha256"]
+            self._general = None
+            self._chapters = {}
+            return
+        raw = path.read_bytes() if path.exists() else default_store.read(path)
+        data = json.loads(raw)
+        self._general = data.get("general_notes") or []
+        self.general_hash = hashlib.sha256(dump_compact(self._general)).hexdigest()
+        self._chapters = {}
+        self.sections = []
+        for section in data.get("sections", []):
+            chapters = []
+            for chapter in section.get("chapters") or []:
+                self._chapters[chapter["ch_number"]] = chapter
+                chapters.append({
+                    "ch_number": chapter["ch_number"],
+                    "title": chapter["title"],
+                    "sha256": hashlib.sha256(dump_compact(chapter)).hexdigest(),
+                })
+            self.sections.append({**{k: section.get(k) for k in ("sec_number", "title", "notes")}, "chapters": chapters})
+
+    def chapter_hashes(self) -> dict:
+        """Chapter number -> (section number, chapter hash), in schedule order."""
+        return {c["ch_number"]: (s["sec_number"], c["sha256"]) for s in self.sections for c in s["chapters"]}
+
+    def chapter(self, ch_number: str) -> dict:
+        """One chapter as a dict (read from its shard on first use)."""
+        if ch_number not in self._chapters:
+            entry = next(c for s in self.sections for c in s["chapters"] if c["ch_number"] == ch_number)
+            self._chapters[ch_number] = json.loads((self.root / entry["file"]).read_bytes())
+        return self._chapters[ch_number]
+
+    @property
+    def general_notes(self) -> list:
+        if self._general is None:
+            self._general = json.loads((self.root / self.general_entry["file"]).read_bytes())
+        return self._general
+
+def _unique(key: str, seen: dict) -> str:
+    """`key`, suffixed with "#n" from its second occurrence on."""
+    seen[key] = seen.get(key, 0) + 1
+    return key if seen[key] == 1 else f"{key}#{seen[key]}"
+
+def _hash(values) -> str:
+    return hashlib.blake2b(dump_compact(values), digest_size=16).hexdigest()
+
+def row_records(chapter: dict) -> dict:
+    """
+    Rows of a chapter keyed for diffing, with the hash of their fields.
+
+    Numbered rows are keyed by their HTS number with punctuation removed.
+    Unnumbered rows ("Other:", "Of cotton:") are keyed by the key of the
+    heading above them plus their description, so an edited unnumbered row
+    shows up as one removal and one addition.
+
+    Returns:
+        dict: key -> (row dict, row hash).
+    """
+    records, seen, stack = {}, {}, []
+    for row in (chapter.get("table") or {}).get("rows") or []:
+        try:
+            level = int(row.get("indent") or 0)
+        except ValueError:
+            level = 0
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        digits = re.sub(r"\D", "", row.get("htsno") or "")
+        parent = stack[-1][1] if stack else f"ch{chapter['ch_number']}"
+        key = _unique(digits or f"{parent}>{(row.get('description') or '').strip()}", seen)
+        records[key] = (row, _hash([row.get(f) for f in ROW_FIELDS]))
+        stack.append((level, key))
+    return records
+
+def note_records(release: Release, chapters, general: bool = True) -> dict:
+    """
+    Notes and titles of a release keyed for diffing: general notes (unless
+    `general` is False), the notes of every section, and the titles,
+    chapter notes and additional U.S. notes of `chapters`.
+
+    Returns:
+        dict: key -> (note dict, note hash).
+    """
+    records, seen = {}, {}
+
+    def add(prefix, notes):
+        for note in notes or []:
+            key = _unique(f"{prefix}/{note.get('note_number') or note.get('title') or ''}", seen)
+            records[key] = (note, _hash([note.get(f) for f in NOTE_FIELDS]))
+
+    if general:
+        add("general", release.general_notes)
+    for section in release.sections:
+        records[f"title/section/{section['sec_number']}"] = ({"title": section["title"]}, _hash(section["title"]))
+        add(f"section/{section['sec_number']}", (section.get("notes") or {}).get("notes"))
+    for ch in chapters:
+        chapter = release.chapter(ch)
+        records[f"title/chapter/{ch}"] = ({"title": chapter["title"]}, _hash(chapter["title"]))
+        add(f"chapter/{ch}", (chapter.get("notes") or {}).get("notes"))
+        add(f"additional/{ch}", (chapter.get("additional") or {}).get("notes"))
+    return records
+
+def field_diff(old: dict, new: dict, fields) -> dict:
+    """Fields whose values differ, as field -> [old, new]."""
+    return {f: [old.get(f), new.get(f)] for f in fields if old.get(f) != new.get(f)}
+
+def _compare(old: dict, new: dict) -> tuple[list, list, list]:
+    """Added, removed and changed keys of two record dicts; hashes decide what changed."""
+    added = [k for k in new if k not in old]
+    removed = [k for k in old if k not in new]
+    changed = [k for k in new if k in old and new[k][1] != old[k][1]]
+    return added, removed, changed
+
+def diff_releases(old: Release, new: Release) -> dict:
+    """
+    Change set between two releases at row and note granularity.
+
+    Chapters are compared by hash first; rows are only hashed in chapters
+    that differ, and only rows whose hash differs get a field-level diff.
+
+    Returns:
+        dict: {"old", "new", "summary", "chapters", "rows", "notes", "reembed"}.
+            `rows` and `notes` hold "added" (full records), "removed" and
+            "changed" (field -> [old, new]). `reembed` lists what the
+            embeddings need: the tariff rows whose description is new or
+            changed (texts as `encoding.load_texts` builds them) and the
+            chapters whose chapter notes changed.
+    """
+    start = time.perf_counter()
+    old_chapters, new_chapters = old.chapter_hashes(), new.chapter_hashes()
+    differing = [ch for ch in new_chapters if old_chapters.get(ch) != new_chapters[ch]]
+    dropped = [ch for ch in old_chapters if ch not in new_chapters]
+    chapters = {
+        "added": [ch for ch in differing if ch not in old_chapters],
+        "removed": dropped,
+        "changed": [ch for ch in differing if ch in old_chapters],
+        "unchanged": len(new_chapters) - len(differing),
+    }
+
+    def rows_of(release, numbers):
+        records = {}
+        for ch in numbers:
+            for key, (row, digest) in row_records(release.chapter(ch)).items():
+                records[key] = ({**row, "chapter": ch}, digest)
+        return records
+
+    old_rows = rows_of(old, [ch for ch in differing if ch in old_chapters] + dropped)
+    new_rows = rows_of(new, differing)
+    added, removed, changed = _compare(old_rows, new_rows)
+    rows = {
+        "added": [{"key": k, **new_rows[k][0]} for k in added],
+        "removed": [{"key": k, "chapter": old_rows[k][0]["chapter"], "htsno": old_rows[k][0].get("htsno"),
+                     "description": old_rows[k][0].get("description")} for k in removed],
+        "changed": [{"key": k, "chapter": new_rows[k][0]["chapter"], "htsno": new_rows[k][0].get("htsno"),
+                     "fields": field_diff(old_rows[k][0], new_rows[k][0], ROW_FIELDS)} for k in changed],
+    }
+
+    general = old.general_hash != new.general_hash
+    old_notes = note_records(old, [ch for ch in differing if ch in old_chapters] + dropped, general)
+    new_notes = note_records(new, differing, general)
+    added, removed, changed = _compare(old_notes, new_notes)
+    notes = {
+        "added": [{"key": k, **new_notes[k][0]} for k in added],
+        "removed": [{"key": k, **old_notes[k][0]} for k in removed],
+        "changed": [{"key": k, "fields": field_diff(old_notes[k][0], new_notes[k][0], NOTE_FIELDS)} for k in changed],
+    }
+
+    retext = [r for r in rows["changed"] if "description" in r["fields"]]
+    reembed = {
+        "tariff_tables": [{"key": r["key"], "chapter": r["chapter"], "htsno": r.get("htsno"), "text": (r.get("description") or "").strip()}
+                          for r in rows["added"]]
+                         + [{"key": r["key"], "chapter": r["chapter"], "htsno": r["htsno"], "text": (r["fields"]["description"][1] or "").strip()}
+                            for r in retext],
+        "chapter_notes": sorted({k.split("/")[1] for k in [n["key"] for n in notes["added"] + notes["removed"] + notes["changed"]]
+                                 if k.startswith("chapter/")}, key=lambda c: (len(c), c)),
+    }
+    summary = {
+        "rows_added": len(rows["added"]),
+        "rows_removed": len(rows["removed"]),
+        "rows_changed": len(rows["changed"]),
+        "notes_added": len(notes["added"]),
+        "notes_removed": len(notes["removed"]),
+        "notes_changed": len(notes["changed"]),
+        "rows_to_embed": len(reembed["tariff_tables"]),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    return {"old": old.label, "new": new.label, "summary": summary, "chapters": chapters,
+            "rows": rows, "notes": notes, "reembed": reembed}
+
+def write_report(changes: dict, output_path: str = "release_diff.md", limit: int = 50):
+    """Write the summary and the first `limit` row and note changes of a change set as Markdown."""
+    s, ch = changes["summary"], changes["chapters"]
+
+    def show(value):
+        text = json.dumps(value, ensure_ascii=False) if not isinstance(value, str) else value
+        text = text.replace("|", "\\|").replace("\n", " ")
+        return text if len(text) <= 80 else text[:77] + "..."
+
+    lines = [
+        f"# Release Diff – {changes['old']} → {changes['new']}\n\n",
+        f"Computed in {s['seconds']:.2f} seconds. Chapters: {len(ch['changed'])} changed, {len(ch['added'])} added, "
+        f"{len(ch['removed'])} removed, {ch['unchanged']} unchanged (skipped by hash).\n\n",
+        "| Kind  | Added | Removed | Changed |\n",
+        "|-------|-------|---------|---------|\n",
+        f"| Rows  | {s['rows_added']:5d} | {s['rows_removed']:7d} | {s['rows_changed']:7d} |\n",
+        f"| Notes | {s['notes_added']:5d} | {s['notes_removed']:7d} | {s['notes_changed']:7d} |\n\n",
+        f"Rows to re-embed: {s['rows_to_embed']}; chapters whose notes need re-embedding: "
+        f"{', '.join(changes['reembed']['chapter_notes']) or 'none'}.\n\n",
+        "## Changed Rows\n\n",
+        "| Key | Field | Old | New |\n",
+        "|-----|-------|-----|-----|\n",
+    ]
+    for r in changes["rows"]["changed"][:limit]:
+        for field, (a, b) in r["fields"].items():
+            lines.append(f"| {r['htsno'] or r['key']} | {field} | {show(a)} | {show(b)} |\n")
+    for title, kind, items in [("Added Rows", "rows", "added"), ("Removed Rows", "rows", "removed")]:
+        lines.append(f"\n## {title}\n\n")
+        for r in changes[kind][items][:limit]:
+            lines.append(f"- `{r.get('htsno') or r['key']}` (chapter {r['chapter']}): {show(r.get('description') or '')}\n")
+    lines.append("\n## Notes\n\n")
+    for kind in ("added", "removed", "changed"):
+        for n in changes["notes"][kind][:limit]:
+            fields = ", ".join(n["fields"]) if kind == "changed" else ""
+            lines.append(f"- {kind}: `{n['key']}`{f' ({fields})' if fields else ''}\n")
+    Path(output_path).write_text("".join(lines), encoding="utf-8")
+
+def main(argv=None):
+    """
+    Usage:
+        python -m src.diff OLD [NEW] [--out PATH]   # NEW defaults to latest
+
+    OLD / NEW: "latest", a date (hts_full_v<date>.json, read from the store
+    if it is no longer on disk), an hts_full file or a shard directory.
+    Writes the change set to data/hts/changes_latest.json (or --out) and a
+    summary to release_diff.md.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    out = Path(argv[argv.index("--out") + 1]) if "--out" in argv else CHANGES_PATH
+    args = [a for i, a in enumerate(argv) if a != "--out" and (i == 0 or argv[i - 1] != "--out")]
+    if not args:
+        raise SystemExit(main.__doc__)
+    start = time.perf_counter()
+    changes = diff_releases(Release(args[0]), Release(args[1] if len(args) > 1 else "latest"))
+    total = time.perf_counter() - start
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(changes, indent=2, ensure_ascii=False), encoding="utf-8")
+    write_report(changes)
+    s = changes["summary"]
+    print(f"{changes['old']} → {changes['new']}: rows +{s['rows_added']} -{s['rows_removed']} ~{s['rows_changed']}, "
+          f"notes +{s['notes_added']} -{s['notes_removed']} ~{s['notes_changed']} ({total:.2f} s including loading)")
+    print(f"Change set written to {out}; summary in release_diff.md")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import hashlib, json, os, re, sys, unicodedata
+from pathlib import Path
+from typing import Callable
+import numpy as np
+
+CACHE_DIR = Path("embeddings/cache")
+
+def normalize_text(text: str) -> str:
+    """Text as it is keyed in the cache: NFC, with runs of whitespace collapsed and the ends stripped."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def text_key(text: str) -> bytes:
+    """16-byte BLAKE2b digest of the normalised text."""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).digest()
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model name, normalised text hash).
+
+    Each model has its own directory under `embeddings/cache/` holding
+    `keys.npy` (the text digests) and `vectors.npy` (one row per key).
+    Entries written by another version of `sentence-transformers` are
+    ignored and replaced on the next save, since its vectors may differ.
+
+    Args:
+        model_name (str): Encoder name, e.g. "all-MiniLM-L6-v2".
+        encoder_version (str, optional): `sentence_transformers.__version__`.
+        root (str | Path): Cache root directory.
+    """
+    def __init__(self, model_name: str, encoder_version: str = None, root: str | Path = CACHE_DIR):
+        self.model_name = model_name
+        self.encoder_version = encoder_version
+        self.dir = Path(root) / re.sub(r"[^\w.-]+", "_", model_name)
+        self.keys = np.empty(0, dtype="S16")
+        self.vectors = None
+        self._rows = {}
+        self._dirty = False
+        info_path = self.dir / "cache_info.json"
+        if info_path.exists():
+            info = json.loads(info_path.read_text(encoding="utf-8"))
+            if info["model_name"] == model_name and info["encoder_version"] == encoder_version:
+                self.keys = np.load(self.dir / "keys.npy")
+                self.vectors = np.load(self.dir / "vectors.npy")
+                raw = self.keys.tobytes()  # tolist() would strip trailing NUL bytes from the digests
+                self._rows = {raw[i:i + 16]: n for n, i in enumerate(range(0, len(raw), 16))}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def encode(self, texts: list[str], encode_fn: Callable) -> tuple[np.ndarray, dict]:
+        """
+        Embeddings of `texts`, calling `encode_fn` only for texts not in the cache.
+
+        Each distinct missing text is encoded once; the result is assembled
+        in the order of `texts`. New vectors are kept in memory until `save()`.
+
+        Args:
+            texts (list[str]): Texts to embed.
+            encode_fn (callable): Maps a list of texts to a 2-D array, e.g.
+                `lambda batch: model.encode(batch, batch_size=32)`.
+        Returns:
+            tuple[np.ndarray, dict]: Embeddings, and counts of `texts`, of
+                texts served from the cache (`hits`) or not (`misses`, so
+                texts = hits + misses), and of distinct texts `encoded`
+                for the misses (at most `misses`, as repeats share one).
+        """
+        keys = [text_key(t) for t in texts]
+        missing, misses = {}, 0
+        for text, key in zip(texts, keys):
+            if key not in self._rows:
+                misses += 1
+                missing.setdefault(key, text)
+        if missing:
+            new = np.asarray(encode_fn(list(missing.values())))
+            start = len(self.keys)
+            self.keys = np.concatenate([self.keys, np.array(list(missing), dtype="S16")])
+            self.vectors = new if self.vectors is None else np.concatenate([self.vectors, new.astype(self.vectors.dtype)])
+            self._rows.update({k: start + i for i, k in enumerate(missing)})
+            self._dirty = True
+        if self.vectors is None:
+            return np.empty((0, 0), dtype=np.float32), {"texts": 0, "hits": 0, "misses": 0, "encoded": 0}
+        embeddings = self.vectors[np.fromiter((self._rows[k] for k in keys), dtype=np.int64, count=len(keys))]
+        return embeddings, {"texts": len(texts), "hits": len(texts) - misses, "misses": misses, "encoded": len(missing)}
+
+    def save(self):
+        """Write the cache if anything was added since it was loaded."""
+        if not self._dirty:
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        for name, array in (("keys.npy", self.keys), ("vectors.npy", self.vectors)):
+            tmp = self.dir / f"{name}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, self.dir / name)
+        info = {
+            "model_name": self.model_name,
+            "encoder_version": self.encoder_version,
+            "count": len(self.keys),
+            "dim": int(self.vectors.shape[1]),
+        }
+        (self.dir / "cache_info.json").write_text(json.dumps(info, indent=2), encoding="utf-8")
+        self._dirty = False
+
+def main(argv=None):
+    """
+    Usage:
+        python -m src.embcache size    # entries and bytes per model
+        python -m src.embcache clear   # delete the whole cache
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    cmd = argv[0] if argv else "size"
+    if cmd == "size":
+        for info_path in sorted(CACHE_DIR.glob("*/cache_info.json")):
+            info = json.loads(info_path.read_text(encoding="utf-8"))
+            size = sum(p.stat().st_size for p in info_path.parent.glob("*.npy"))
+            print(f"{info['model_name']} ({info['encoder_version']}): {info['count']} texts, dim {info['dim']}, {size / 1024 / 1024:.1f} MB")
+    elif cmd == "clear":
+        for path in CACHE_DIR.glob("*/*"):
+            path.unlink()
+        print(f"Cleared {CACHE_DIR}")
+    else:
+        print(main.__doc__)
+
+if __name__ == "__main__":
+    main()
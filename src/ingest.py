@@ -1,10 +1,16 @@
-import re, json, requests, pdfplumber
+import re, json
 from datetime import date
 from typing import List
 from .base import Source
 from .models import Section, Chapter
+from .utils import HTS_HOST
+from .pdftext import PdfDocument
+from .cache import DownloadCache, sha256_file
+from .store import default_store
 from pathlib import Path
 
+toc_cache = DownloadCache("data/sections")
+
 class HTSSource(Source):
     """
     Handles downloading, parsing, and saving the HTS Table of Contents PDF.
@@ -14,7 +20,7 @@ class HTSSource(Source):
     - Saves the parsed data to a JSON file.
     """
 
-    TOC_URL = "https://hts.usitc.gov/reststop/file?filename=Table+of+Contents&release=currentRelease"
+    TOC_URL = f"{HTS_HOST}/reststop/file?filename=Table+of+Contents&release=currentRelease"
 
     def fetch(self, pdf_path: str = "data/sections/hts_toc.pdf") -> str:
         """
@@ -24,13 +30,31 @@ class HTSSource(Source):
         Returns:
             Path to the saved PDF file.
         """
-        resp = requests.get(self.TOC_URL, stream=True)
-        resp.raise_for_status()
-        with open(pdf_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                f.write(chunk)
+        Path(pdf_path).parent.mkdir(parents=True, exist_ok=True)
+        toc_cache.fetch("hts_toc", self.TOC_URL, pdf_path)
         return pdf_path
 
+    def release_id(self, pdf_path: str = "data/sections/hts_toc.pdf") -> str:
+        """
+        Identify the HTS release a Table of Contents PDF belongs to.
+
+        The TOC cover names the edition (e.g. "Harmonized Tariff Schedule of the
+        United States (2025) Revision 12"). When no edition line is found the
+        PDF hash is used instead, so a changed TOC still reads as a new release.
+
+        Args:
+            pdf_path: Path to the fetched TOC PDF.
+        Returns:
+            Release id such as '2025 Revision 12', or 'sha256:<hash>'.
+        """
+        with PdfDocument(pdf_path) as doc:
+            first = next((t for t in doc.iter_pages(0, 0) if t), "")
+        year = re.search(r"\((\d{4})\)", first)
+        revision = re.search(r"Revision\s+(\d+)", first, re.IGNORECASE)
+        if year:
+            return f"{year.group(1)} Revision {revision.group(1)}" if revision else year.group(1)
+        return f"sha256:{sha256_file(Path(pdf_path))}"
+
     def parse(self, pdf_path: str = "hts_toc.pdf") -> List[Section]:
         """
         Read the PDF and turn it into a list of Section objects.
@@ -44,9 +68,8 @@ class HTSSource(Source):
             List of Section objects.
         """
         text_parts = []
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
+        with PdfDocument(pdf_path) as doc:
+            for page_text in doc.page_texts(0, 0):
                 if page_text:
                     text_parts.append(page_text)
         lines = [line.strip() for line in "\n".join(text_parts).splitlines() if line.strip()]
@@ -126,7 +149,6 @@ class HTSSource(Source):
 
         combined = existing + new_data
 
-        versioned_path.write_text(json.dumps(combined, indent=2, ensure_ascii=False), encoding="utf-8")
-        latest_path.write_text(json.dumps(combined, indent=2, ensure_ascii=False), encoding="utf-8")
+        default_store.save_text(json.dumps(combined, indent=2, ensure_ascii=False), latest_path, versioned_path)
 
         return str(versioned_path)
\ No newline at end of file
@@ -0,0 +1,127 @@
+import hashlib, json, os, threading
+from pathlib import Path
+from pydantic import BaseModel
+from . import models
+
+JOURNAL_PATH = Path("data/journal/ingest_journal.jsonl")
+
+def encode(data):
+    """
+    Turn parsed output (models, tuples of models, lists, None) into JSON-safe
+    values tagged with their model class so `decode` can rebuild them.
+    """
+    if isinstance(data, BaseModel):
+        return {"__model__": type(data).__name__, "data": data.model_dump()}
+    if isinstance(data, tuple):
+        return {"__tuple__": [encode(d) for d in data]}
+    if isinstance(data, list):
+        return [encode(d) for d in data]
+    if isinstance(data, dict):
+        return {k: encode(v) for k, v in data.items()}
+    return data
+
+def decode(value):
+    """Inverse of `encode`."""
+    if isinstance(value, dict):
+        if "__model__" in value:
+            return getattr(models, value["__model__"]).model_validate(value["data"])
+        if "__tuple__" in value:
+            return tuple(decode(v) for v in value["__tuple__"])
+        return {k: decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    return value
+
+def digest(value) -> str:
+    """SHA-256 of a JSON-safe value in canonical form."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class Journal:
+    """
+    Append-only checkpoint journal for an ingestion run.
+
+    Each line records one finished step: dataset, item (chapter or note
+    number), stage ("fetched", "parsed", "saved"), the output hash, and for
+    parsed items the encoded output itself, so a resumed run can rebuild
+    `save()` input without fetching or parsing the item again. Every line is
+    flushed and fsync'ed before the run moves on. `record` is thread-safe.
+
+    Only entry headers and their byte offsets are kept in memory; the parsed
+    payload is read back from disk by `parsed()`. Resumed and incremental
+    runs append to the same file, so `compact()` is called after a
+    successful run to keep only the latest line per step; the journal then
+    holds one release's worth of output instead of growing every run.
+    """
+    def __init__(self, path: str | Path = JOURNAL_PATH, resume: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.entries: dict[tuple, dict] = {}
+        end = 0
+        if resume and self.path.exists():
+            with open(self.path, "rb") as f:
+                for line in iter(f.readline, b""):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from an interrupted write
+                    self._index(entry, end)
+                    end += len(line)
+        self._f = open(self.path, "r+b" if resume and self.path.exists() else "wb")
+        self._f.seek(end)
+        self._f.truncate()  # drop a torn tail so new lines start clean
+        self._lock = threading.Lock()
+
+    def _index(self, entry: dict, offset: int):
+        entry.pop("data", None)
+        entry["offset"] = offset
+        self.entries[(entry["dataset"], entry["item"], entry["stage"])] = entry
+
+    def record(self, dataset: str, item, stage: str, data=None, output_hash: str = None, **extra) -> dict:
+        """Durably append one step; `data` is encoded and hashed when given."""
+        entry = {"dataset": dataset, "item": item, "stage": stage, **extra}
+        if data is not None:
+            entry["data"] = encode(data)
+            output_hash = output_hash or digest(entry["data"])
+        entry["hash"] = output_hash
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            offset = self._f.tell()
+            self._f.write(line)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._index(entry, offset)
+        return entry
+
+    def get(self, dataset: str, item, stage: str) -> dict | None:
+        return self.entries.get((dataset, item, stage))
+
+    def has(self, dataset: str, item, stage: str) -> bool:
+        return (dataset, item, stage) in self.entries
+
+    def parsed(self, dataset: str, item):
+        """Decoded parse output recorded for an item (raises KeyError if missing)."""
+        offset = self.entries[(dataset, item, "parsed")]["offset"]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return decode(json.loads(f.readline()).get("data"))
+
+    def compact(self):
+        """Rewrite the journal with only the latest line of every (dataset, item, stage)."""
+        with self._lock:
+            self._f.flush()
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+                for entry in sorted(self.entries.values(), key=lambda e: e["offset"]):
+                    src.seek(entry["offset"])
+                    line = src.readline()
+                    entry["offset"] = dst.tell()
+                    dst.write(line)
+                dst.flush()
+                os.fsync(dst.fileno())
+            self._f.close()
+            os.replace(tmp, self.path)
+            self._f = open(self.path, "r+b")
+            self._f.seek(0, os.SEEK_END)
+
+    def close(self):
+        self._f.close()
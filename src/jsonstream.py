@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+from typing import Iterator, TextIO
+
+CHUNK_SIZE = 1 << 16
+
+def iter_json_array(path: str | Path, chunk_size: int = CHUNK_SIZE) -> Iterator:
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    The file is read in `chunk_size` pieces and each element is decoded with
+    `JSONDecoder.raw_decode`, so only the current element and one chunk are
+    in memory, however large the array is.
+
+    Args:
+        path (str | Path): JSON file holding an array.
+        chunk_size (int): Characters read per refill.
+    Raises:
+        ValueError: If the file is not a JSON array or is malformed.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def fill():
+            nonlocal buf, pos, eof
+            more = f.read(chunk_size)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
+
+        def skip(chars=" \t\r\n"):
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in chars:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                fill()
+
+        skip()
+        if pos >= len(buf) or buf[pos] != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+        first = True
+        while True:
+            skip()
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            if not first:
+                if pos >= len(buf) or buf[pos] != ",":
+                    raise ValueError(f"{path}: expected ',' or ']' at element boundary")
+                pos += 1
+                skip()
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()
+                    continue
+                if end == len(buf) and not eof:
+                    fill()  # a scalar may continue in the next chunk
+                    continue
+                break
+            yield obj
+            pos = end
+            first = False
+            if pos > chunk_size:
+                buf, pos = buf[pos:], 0
+
+class JsonArrayWriter:
+    """
+    Write a JSON array element by element.
+
+    The output is byte-for-byte what `json.dumps(elements, indent=indent,
+    ensure_ascii=False)` would produce for the whole list, without building
+    the list or the full string in memory.
+    """
+    def __init__(self, f: TextIO, indent: int = None):
+        self.f = f
+        self.indent = indent
+        self.count = 0
+
+    def write(self, obj):
+        if self.indent is None:
+            self.f.write(("[" if not self.count else ", ") + json.dumps(obj, ensure_ascii=False))
+        else:
+            pad = " " * self.indent
+            text = json.dumps(obj, indent=self.indent, ensure_ascii=False)
+            self.f.write(("[\n" if not self.count else ",\n") + pad + text.replace("\n", "\n" + pad))
+        self.count += 1
+
+    def close(self):
+        if not self.count:
+            self.f.write("[]")
+        else:
+            self.f.write("]" if self.indent is None else "\n]")
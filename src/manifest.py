@@ -0,0 +1,49 @@
+import json, os
+from pathlib import Path
+
+MANIFEST_PATH = Path("data/manifest.json")
+
+class Manifest:
+    """
+    Record of what the last ingestion was built from.
+
+    Holds the HTS release id and, per dataset and item (chapter or note
+    number), the hash of the fetched source document and of its parsed
+    output. An incremental run compares fresh source hashes against it to
+    decide which items need parsing and saving again.
+
+    Layout of `data/manifest.json`:
+        {"release": "2025 Revision 12",
+         "documents": {"Chapter PDFs": {"5": {"source_hash": ..., "output_hash": ...}}}}
+    """
+    def __init__(self, path: str | Path = MANIFEST_PATH):
+        self.path = Path(path)
+        data = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+        self.release = data.get("release")
+        self.documents: dict[str, dict] = data.get("documents", {})
+
+    def get(self, dataset: str, item) -> dict | None:
+        return self.documents.get(dataset, {}).get(str(item))
+
+    def source_hash(self, dataset: str, item) -> str | None:
+        entry = self.get(dataset, item)
+        return entry["source_hash"] if entry else None
+
+    def update(self, dataset: str, item, source_hash: str, output_hash: str = None):
+        self.documents.setdefault(dataset, {})[str(item)] = {
+            "source_hash": source_hash,
+            "output_hash": output_hash,
+        }
+
+    def changed(self, dataset: str, item, source_hash: str) -> bool:
+        """Whether `item` is new or its source document differs from the recorded one."""
+        return self.source_hash(dataset, item) != source_hash
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(
+            json.dumps({"release": self.release, "documents": self.documents}, indent=2),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
@@ -1,6 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional, Any, Union
 
+# Nested models are combined from instances that were validated when they were
+# parsed (e.g. `Chapter(table=TariffTable(...))` in `combine`); pass those
+# through as they are instead of validating every row and footnote again.
+NESTED_CONFIG = ConfigDict(revalidate_instances="never")
+
 class Note(BaseModel):
     """
     Represents an individual numbered note within a section or chapter.
@@ -9,6 +14,8 @@ class Note(BaseModel):
         text (str): Text content of the note.
         sub_items (Optional[List[Union[str, dict]]]): Optional nested sub-items within the note.
     """
+    model_config = NESTED_CONFIG
+
     note_number: str
     text: str
     sub_items:  Optional[List[Union[str, dict]]] = None
@@ -20,6 +27,8 @@ class ChapterNote(BaseModel):
         chapter_number (str): The chapter number, e.g. "3" or "98".
         notes (List[Note]): List of Note objects for this chapter.
     """
+    model_config = NESTED_CONFIG
+
     chapter_number: str
     notes: List[Note]
 
@@ -30,6 +39,8 @@ class SectionNote(BaseModel):
         section_number (str): The section number in Roman numerals, e.g. "I" or "XVI".
         notes (List[Note]): List of Note objects for this section.
     """
+    model_config = NESTED_CONFIG
+
     section_number: str
     notes: List[Note]
 
@@ -41,6 +52,8 @@ class AdditionalUSNotes(BaseModel):
         chapter_number (str): Chapter number to which these notes belong.
         notes (List[Note]): List of Note objects in this section.
     """
+    model_config = NESTED_CONFIG
+
     chapter_number: str
     notes: list[Note]
 
@@ -54,6 +67,8 @@ class Footnote(BaseModel):
         value (str): The actual text of the footnote.
         type (Optional[str]): Optional categorization or type of footnote.
     """
+    model_config = NESTED_CONFIG
+
     columns: List[str]
     marker: Optional[str] = None
     value: str
@@ -77,6 +92,8 @@ class TariffRow(BaseModel):
         additionalDuties (Optional[str]): Additional duties text.
         addiitionalDuties (Optional[Any]): Typo-preserving legacy field; use `additionalDuties` instead.
     """
+    model_config = NESTED_CONFIG
+
     htsno: Optional[str]
     indent: Optional[str]
     description: str
@@ -98,6 +115,8 @@ class TariffTable(BaseModel):
         chapter_number (str): The chapter identifier.
         rows (List[TariffRow]): The rows making up the tariff data.
     """
+    model_config = NESTED_CONFIG
+
     chapter_number: str
     rows: List[TariffRow]
 
@@ -112,6 +131,8 @@ class Chapter(BaseModel):
         additional (Optional[AdditionalUSNotes]): Additional U.S. Notes associated with this chapter.
         table (Optional[TariffTable]): Tariff table data if available.
     """
+    model_config = NESTED_CONFIG
+
     ch_number: str
     title: str
     notes: Optional[ChapterNote] = None
@@ -128,6 +149,8 @@ class Section(BaseModel):
         notes (Optional[SectionNote]): Section-level notes, if any.
         chapters (List[Chapter]): A list of chapters belonging to this section.
     """
+    model_config = NESTED_CONFIG
+
     sec_number: str
     title: str
     notes: Optional[SectionNote] = None
@@ -142,6 +165,8 @@ class GeneralNote(BaseModel):
         text (str): Full text of the General Note body.
         sub_items (Optional[List[Union[str, dict]]]): Nested sub-items or enumerations within the note.
     """
+    model_config = NESTED_CONFIG
+
     note_number: Optional[str]
     title: str
     text: str
@@ -1,18 +1,27 @@
 from .base import Source
 from .models import GeneralNote, SectionNote, ChapterNote, Note, AdditionalUSNotes
-import pdfplumber, json, re
+import json, re
+from contextlib import nullcontext
 from datetime import date
 from pathlib import Path
 from typing import Optional
-from .utils import get_retry, deduplicate
+from .utils import deduplicate, HTS_HOST
+from .cache import DownloadCache
+from .store import default_store
+from .pdftext import PdfDocument, TextCache, default_cache
 
-BASE_URL = "https://hts.usitc.gov/reststop/file"
+BASE_URL = f"{HTS_HOST}/reststop/file"
 pdf_ch = Path("pdf/chapters")
+chapter_cache = DownloadCache(pdf_ch)
+general_cache = DownloadCache("pdf/general_notes")
 
 def versioning(data, base_filename: str, folder: str = "pdf", version: str | None = None) -> str:
     """
     Save data to a JSON file with versioned filename and 'latest' copy.
 
+    Both names go through the object store (`src.store`), which stores the
+    chunks they share once.
+
     Args:
         data: A list of Pydantic models or a single model.
         base_filename: Base name without extension (e.g. 'general_notes').
@@ -36,19 +45,23 @@ def versioning(data, base_filename: str, folder: str = "pdf", version: str | Non
         payload = data.model_dump()
 
     text = json.dumps(payload, indent=2, ensure_ascii=False)
-    versioned_path.write_text(text, encoding="utf-8")
-    latest_path.write_text(text, encoding="utf-8")
+    default_store.save_text(text, latest_path, versioned_path)
 
     return str(versioned_path)
 
-def download_chapter_pdf(chapter_num: int, filename: str = None) -> str:
+def download_chapter_pdf(chapter_num: int, filename: str = None, release: str = "currentRelease") -> str:
     """
     Download a chapter PDF from the HTS site and save it under pdf.
 
+    Downloads go through `chapter_cache`, so the section, chapter and
+    additional-notes sources share one copy of each chapter PDF per run,
+    and re-runs only revalidate files already on disk.
+
     Args:
         chapter_num (int): Chapter number to download.
         filename (str, optional): Custom PDF filename.
             Defaults to 'chapter_{chapter_num}.pdf'.
+        release (str, optional): HTS release name. Defaults to 'currentRelease'.
 
     Returns:
         str: Full path to the saved PDF file.
@@ -56,14 +69,9 @@ def download_chapter_pdf(chapter_num: int, filename: str = None) -> str:
     if filename is None:
         filename = f"chapter_{chapter_num}.pdf"
     pdf_path = pdf_ch / filename
-    pdf_path.parent.mkdir(parents=True, exist_ok=True)
 
-    url = f"{BASE_URL}?release=currentRelease&filename=Chapter%20{chapter_num}"
-    r = get_retry(url)
-    r.raise_for_status()
-
-    with open(pdf_path, "wb") as f:
-        f.write(r.content)
+    url = f"{BASE_URL}?release={release}&filename=Chapter%20{chapter_num}"
+    chapter_cache.fetch(f"chapter_{chapter_num}", url, pdf_path, release=release)
 
     return str(pdf_path)
 
@@ -80,18 +88,52 @@ def find_repeated(lines_list: list[str]) -> list[str]:
         checked.add(line)
     return repeated
 
-def extract_clean_text(pdf_path: str, crop_top: int = 50, crop_bottom: int = 50) -> tuple[str, list[str], list[str]]:
+# Lines that close a notes block; everything the note parsers read comes before them
+NOTES_END_RE = re.compile(r"^\s*(?:Subheading\s+Notes?|Statistical\s+Notes?|Heading/|Rates\s+of\s+Duty)", re.I | re.M)
+# Tariff table header; no notes follow it
+TABLE_START_RE = re.compile(r"^\s*(?:Heading/|Rates\s+of\s+Duty)", re.I | re.M)
+
+class ChapterDocument(PdfDocument):
+    """
+    A chapter PDF opened once and shared by the section, chapter and
+    additional-notes parsers.
+
+    Pages are extracted lazily, at most once per crop box (and read from the
+    extracted-text cache when present), so a parser that stops early (see
+    `pages_until`) never pays for the tariff table pages behind the notes.
+    Cleaned text from `extract_clean_text` is memoized as well.
+    """
+    def __init__(self, pdf_path: str | Path, cache: Optional[TextCache] = default_cache):
+        super().__init__(pdf_path, cache)
+        self._clean: dict[tuple, tuple[str, list[str], list[str]]] = {}
+
+def chapter_document(pdf: str | ChapterDocument):
+    """
+    Context manager yielding a ChapterDocument for a path or an existing document.
+    Documents passed in are left open for the caller to reuse.
+    """
+    return nullcontext(pdf) if isinstance(pdf, ChapterDocument) else ChapterDocument(pdf)
+
+def extract_clean_text(pdf_path: str | ChapterDocument, crop_top: int = 50, crop_bottom: int = 50, stop: re.Pattern = None) -> tuple[str, list[str], list[str]]:
     """
     Read PDF and return combined text (headers/footers removed), plus
     header_candidates and footer_candidates lists.
+
+    With `stop`, pages are only read until the pattern matches (plus one
+    page of lookahead) instead of to the end of the document.
     """
-    lines_per_page = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            bbox = (0, crop_top, page.width, page.height - crop_bottom)
-            t = page.within_bbox(bbox).extract_text()
-            if t:
-                lines_per_page.append(t.split("\n"))
+    with chapter_document(pdf_path) as doc:
+        key = (crop_top, crop_bottom, stop.pattern if stop else None)
+        if key not in doc._clean:
+            if stop is None:
+                pages = doc.page_texts(crop_top, crop_bottom)
+            else:
+                pages = doc.pages_until(stop.search, crop_top, crop_bottom)
+            doc._clean[key] = _clean_text(pages)
+        return doc._clean[key]
+
+def _clean_text(page_texts: list[Optional[str]]) -> tuple[str, list[str], list[str]]:
+    lines_per_page = [t.split("\n") for t in page_texts if t]
 
     if not lines_per_page:
         return "", [], []
@@ -118,6 +160,7 @@ class GeneralNotesSource(Source):
     def fetch(self, note_num: int, pdf_path: str = None) -> str:
         """
         Download a specific General Note PDF to the default folder.
+        Unchanged notes are revalidated through `general_cache` instead of re-downloaded.
         """
         # ensure folder exists
         pdf_dir = Path("pdf/general_notes")
@@ -133,17 +176,13 @@ class GeneralNotesSource(Source):
             "filename": f"General Note {note_num}",
             "release": "currentRelease"
         }
-        resp = get_retry(BASE_URL, params=params, stream=True)
-        resp.raise_for_status()
-        with open(pdf_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                f.write(chunk)
+        general_cache.fetch(f"general_note_{note_num}", BASE_URL, pdf_path, params=params)
         return str(pdf_path)
 
     # Parse
     def parse(self, pdf_path: str, note_num: int) -> GeneralNote:
-        with pdfplumber.open(pdf_path) as pdf:
-            pages = [p.extract_text() or "" for p in pdf.pages]
+        with PdfDocument(pdf_path) as doc:
+            pages = [t or "" for t in doc.page_texts(0, 0)]
         # --- 1) Clean headers/footers ---
         header_re = re.compile(
             r"(harmonized tariff schedule|annotated for statistical reporting|revision\s*\d+|\bgn\s*p\.?\d+\b)",
@@ -262,8 +301,8 @@ class SectionNotesSource(Source):
     def fetch(self, chapter_num: int, filename: str = None) -> str:
         return download_chapter_pdf(chapter_num, filename)
 
-    def parse(self, pdf_path: str) -> Optional[SectionNote]:
-        text, _, _ = extract_clean_text(pdf_path)
+    def parse(self, pdf_path: str | ChapterDocument) -> Optional[SectionNote]:
+        text, _, _ = extract_clean_text(pdf_path, stop=NOTES_END_RE)
         if not text:
             return SectionNote(section_number="?", notes=[])
 
@@ -361,8 +400,8 @@ class ChapterNotesSource(Source):
     def fetch(self, chapter_num: int, filename: str = None) -> str:
         return download_chapter_pdf(chapter_num, filename)
 
-    def parse(self, pdf_path: str) -> ChapterNote:
-        clean_text, header_candidates, footer_candidates = extract_clean_text(pdf_path)
+    def parse(self, pdf_path: str | ChapterDocument) -> ChapterNote:
+        clean_text, header_candidates, footer_candidates = extract_clean_text(pdf_path, stop=NOTES_END_RE)
         if not clean_text:
             return ChapterNote(chapter_number="?", notes=[])
         # 4. Detect chapter number
@@ -450,19 +489,21 @@ class AdditionalUSNotesSource(Source):
     def fetch(self, chapter_num: int, filename: str = None) -> str:
         return download_chapter_pdf(chapter_num, filename)
 
-    def parse(self, pdf_path: str) -> AdditionalUSNotes:
+    def parse(self, pdf_path: str | ChapterDocument) -> AdditionalUSNotes:
         """
         Extract Additional U.S. Notes from a single-chapter PDF.
 
         Only triggers if the exact case-sensitive heading "Additional U.S. Notes"
         or "Additional U.S. Note" appears.
-        Stops at Subheading Notes, Statistical Notes, table headers, or EOF.
+        Stops at Subheading Notes, Statistical Notes, table headers, or EOF;
+        pages after the stop are never extracted.
         Splits notes only on lines starting with small integer note numbers
         followed by a dot and whitespace (e.g. "7. The ...") to avoid treating
         HS codes like "1701.91.44" as note boundaries.
 
         Args:
-            pdf_path (str): Path to the chapter PDF file.
+            pdf_path (str | ChapterDocument): Path to the chapter PDF file, or an
+                already opened ChapterDocument.
 
         Returns:
             AdditionalUSNotes: Structured representation of the Additional U.S. Notes,
@@ -470,11 +511,16 @@ class AdditionalUSNotesSource(Source):
         """
         # 1) read pdf text
         text = ""
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                # crop margins to avoid headers/footers
-                bbox = (0, 50, page.width,page.height)
-                t = page.within_bbox(bbox).extract_text()
+        def notes_over(text):
+            # Stop at the table, or at the first closing marker after the heading
+            if TABLE_START_RE.search(text):
+                return True
+            idx = text.find("Additional U.S. Note")
+            return idx != -1 and NOTES_END_RE.search(text, idx) is not None
+
+        with chapter_document(pdf_path) as doc:
+            # crop top margin to avoid headers
+            for t in doc.pages_until(notes_over, crop_top=50, crop_bottom=0, lookahead=0):
                 if t:
                     t = re.sub(r"Additional U\.S\. Notes \(con\.\)", "", t)
                     t = re.sub(r"Additional U\.S\. Notes: \(con\.\)", "", t)
@@ -607,3 +653,54 @@ class AdditionalUSNotesSource(Source):
             data = deduplicate(data, "chapter_number")
         base_filename = filepath or "additional_us_notes"
         return versioning(data, base_filename, folder="data/notes/additional", version=version)
+
+
+class ChapterPdfSource(Source):
+    """
+    Combined source for the three note types that live in a chapter PDF.
+
+    Each chapter PDF is fetched once and opened once; `parse` hands the same
+    ChapterDocument to the section, chapter and additional-notes parsers and
+    `save` writes each dataset through its own source.
+    """
+    def __init__(self):
+        self.section = SectionNotesSource()
+        self.chapter = ChapterNotesSource()
+        self.additional = AdditionalUSNotesSource()
+
+    def fetch(self, chapter_num: int, filename: str = None) -> str:
+        return download_chapter_pdf(chapter_num, filename)
+
+    def parse(self, pdf_path: str | ChapterDocument) -> tuple[Optional[SectionNote], ChapterNote, Optional[AdditionalUSNotes]]:
+        return parse_chapter(pdf_path)
+
+    def save(self, data: list[tuple], version: str = None):
+        # `data` may be a generator, so it is split in a single pass
+        sections, chapters, additional = [], [], []
+        for s, c, a in data:
+            if s is not None:
+                sections.append(s)
+            if c is not None:
+                chapters.append(c)
+            if a is not None:
+                additional.append(a)
+        return (
+            self.section.save(sections, version=version),
+            self.chapter.save(chapters, version=version),
+            self.additional.save(additional, version=version),
+        )
+
+def parse_chapter(pdf_path: str | ChapterDocument) -> tuple[Optional[SectionNote], ChapterNote, Optional[AdditionalUSNotes]]:
+    """
+    Parse section, chapter and Additional U.S. notes from one chapter PDF,
+    extracting its pages only once.
+
+    Returns:
+        tuple: (SectionNote or None, ChapterNote, AdditionalUSNotes or None)
+    """
+    with chapter_document(pdf_path) as doc:
+        return (
+            SectionNotesSource().parse(doc),
+            ChapterNotesSource().parse(doc),
+            AdditionalUSNotesSource().parse(doc),
+        )
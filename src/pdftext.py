@@ -0,0 +1,196 @@
+import json, os, sys
+from pathlib import Path
+from typing import Optional
+import pdfplumber
+from .cache import sha256_file
+
+CACHE_DIR = Path("cache/text")
+EXTRACTOR = f"pdfplumber {pdfplumber.__version__}"
+
+class TextCache:
+    """
+    Sidecar cache of extracted page text, keyed by PDF content hash.
+
+    One JSON file per PDF (`<sha256>.json`) holds, for every crop box that
+    was extracted, the page texts pulled so far and whether that crop is
+    complete. Entries written by a different extractor version are ignored,
+    so re-parsing after a parser change never re-runs pdfplumber.
+    """
+    def __init__(self, root: str | Path = CACHE_DIR):
+        self.root = Path(root)
+
+    def path(self, digest: str) -> Path:
+        return self.root / f"{digest}.json"
+
+    def load(self, digest: str) -> dict:
+        """Cached crops for a PDF hash, or an empty entry if none are usable."""
+        path = self.path(digest)
+        if path.exists():
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except ValueError:
+                entry = {}
+            if entry.get("extractor") == EXTRACTOR:
+                return entry
+        return {"extractor": EXTRACTOR, "crops": {}}
+
+    def store(self, digest: str, entry: dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path(digest)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def size(self) -> dict:
+        """File count, total bytes and number of entries per extractor version."""
+        files = list(self.root.glob("*.json")) if self.root.exists() else []
+        extractors = {}
+        for f in files:
+            try:
+                name = json.loads(f.read_text(encoding="utf-8")).get("extractor", "?")
+            except ValueError:
+                name = "?"
+            extractors[name] = extractors.get(name, 0) + 1
+        return {"files": len(files), "bytes": sum(f.stat().st_size for f in files), "extractors": extractors}
+
+    def invalidate(self, pdf_paths: list[str] = None, stale_only: bool = False) -> int:
+        """
+        Delete cache entries and return how many were removed.
+
+        Args:
+            pdf_paths (list[str], optional): Only drop entries for these PDFs.
+            stale_only (bool): Only drop entries from another extractor version.
+        """
+        if not self.root.exists():
+            return 0
+        if pdf_paths:
+            targets = [self.path(sha256_file(Path(p))) for p in pdf_paths]
+        else:
+            targets = list(self.root.glob("*.json"))
+        removed = 0
+        for f in targets:
+            if not f.exists():
+                continue
+            if stale_only:
+                try:
+                    current = json.loads(f.read_text(encoding="utf-8")).get("extractor") == EXTRACTOR
+                except ValueError:
+                    current = False
+                if current:
+                    continue
+            f.unlink()
+            removed += 1
+        return removed
+
+default_cache = TextCache()
+
+class PdfDocument:
+    """
+    A PDF whose page text is extracted lazily, at most once per crop box.
+
+    Extracted pages are kept in memory and, when a TextCache is given,
+    read from and written back to the sidecar cache keyed by the PDF hash.
+    A crop of (0, 0) uses `page.extract_text()` on the full page.
+    Use as a context manager, or call `close()`, to release the PDF and
+    flush new pages to the cache.
+    """
+    def __init__(self, pdf_path: str | Path, cache: Optional[TextCache] = default_cache):
+        self.pdf_path = str(pdf_path)
+        self.cache = cache
+        self._pdf = None
+        self._digest = None
+        self._dirty = False
+        if cache is not None:
+            self._digest = sha256_file(Path(self.pdf_path))
+            self._entry = cache.load(self._digest)
+        else:
+            self._entry = {"extractor": EXTRACTOR, "crops": {}}
+
+    def _crop(self, crop_top: int, crop_bottom: int) -> dict:
+        return self._entry["crops"].setdefault(f"{crop_top},{crop_bottom}", {"pages": [], "complete": False})
+
+    def iter_pages(self, crop_top: int = 50, crop_bottom: int = 50):
+        """Lazily yield the text of each page within the crop box (None for empty pages)."""
+        crop = self._crop(crop_top, crop_bottom)
+        cached = crop["pages"]
+        i = 0
+        while True:
+            if i < len(cached):
+                yield cached[i]
+                i += 1
+                continue
+            if crop["complete"]:
+                return
+            if self._pdf is None:
+                self._pdf = pdfplumber.open(self.pdf_path)
+            if i >= len(self._pdf.pages):
+                crop["complete"] = True
+                self._dirty = True
+                return
+            page = self._pdf.pages[i]
+            if (crop_top, crop_bottom) == (0, 0):
+                cached.append(page.extract_text())
+            else:
+                bbox = (0, crop_top, page.width, page.height - crop_bottom)
+                cached.append(page.within_bbox(bbox).extract_text())
+            self._dirty = True
+
+    def page_texts(self, crop_top: int = 50, crop_bottom: int = 50) -> list[Optional[str]]:
+        """Text of every page within the crop box (None for empty pages)."""
+        return list(self.iter_pages(crop_top, crop_bottom))
+
+    def pages_until(self, done, crop_top: int = 50, crop_bottom: int = 50, lookahead: int = 1) -> list[Optional[str]]:
+        """
+        Pull pages until `done(text_so_far)` is true, then `lookahead` more.
+
+        The extra page keeps at least two pages around for the repeated
+        header/footer detection in `notes.extract_clean_text`.
+        """
+        texts = []
+        remaining = None
+        for t in self.iter_pages(crop_top, crop_bottom):
+            texts.append(t)
+            if remaining is None:
+                if t and done("\n".join(x for x in texts if x)):
+                    remaining = lookahead
+            else:
+                remaining -= 1
+            if remaining == 0:
+                break
+        return texts
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+        if self._dirty and self.cache is not None:
+            self._entry["pdf"] = Path(self.pdf_path).name
+            self.cache.store(self._digest, self._entry)
+            self._dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main(argv=None):
+    """Usage: python -m src.pdftext [size | clear [--stale] [PDF ...]]"""
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "size"
+    if command == "size":
+        info = default_cache.size()
+        print(f"{info['files']} cached PDFs, {info['bytes'] / 1024 / 1024:.1f} MB in {default_cache.root}")
+        for name, count in info["extractors"].items():
+            marker = "" if name == EXTRACTOR else " (stale)"
+            print(f"  {name}: {count}{marker}")
+    elif command == "clear":
+        stale = "--stale" in argv
+        pdfs = [a for a in argv[1:] if a != "--stale"]
+        removed = default_cache.invalidate(pdfs or None, stale_only=stale)
+        print(f"Removed {removed} cache entries")
+    else:
+        raise SystemExit(main.__doc__)
+
+if __name__ == "__main__":
+    main()
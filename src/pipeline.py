@@ -0,0 +1,211 @@
+import os, queue, threading, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .ratelimit import MAX_PER_HOST
+
+def timed_fetch(source, item):
+    """
+    Fetch one document and time it.
+
+    Returns:
+        tuple: (fetched path, fetch time in seconds)
+    """
+    t0 = time.perf_counter()
+    path = source.fetch(item)
+    return path, time.perf_counter() - t0
+
+def timed_parse(source, path, item, parse_ch: bool = False):
+    """
+    Parse one fetched document and time it.
+
+    Runs inside pool workers, so it must stay a module-level function.
+
+    Returns:
+        tuple: (parsed data, parse time in seconds)
+    """
+    t0 = time.perf_counter()
+    data = source.parse(path, item) if parse_ch else source.parse(path)
+    return data, time.perf_counter() - t0
+
+class Dataset:
+    """
+    One dataset flowing through `run_pipeline`.
+
+    Args:
+        name (str): Dataset name for reporting and the journal.
+        source: Source handler with `fetch` and `parse`.
+        items (list): Chapter / note numbers to fetch, in output order.
+        on_done (callable): `on_done()` once every item is fetched and parsed;
+            builds and saves the dataset and returns the save time in seconds.
+        parse_ch (bool): Whether to pass the item number to parse.
+        on_fetched (callable, optional): `on_fetched(item, path, fetch_time)`; return
+            False to skip parsing the item (e.g. its source is unchanged).
+        on_parsed (callable, optional): `on_parsed(item, data, parse_time)`.
+    """
+    def __init__(self, name, source, items, on_done, parse_ch=False, on_fetched=None, on_parsed=None):
+        self.name = name
+        self.source = source
+        self.items = list(items)
+        self.on_done = on_done
+        self.parse_ch = parse_ch
+        self.on_fetched = on_fetched
+        self.on_parsed = on_parsed
+        self.fetch_times = {}
+        self.parse_times = {}
+        self.save_time = 0.0
+        self.started = None
+        self.finished = None
+
+def run_pipeline(datasets: list[Dataset], fetch_workers: int = MAX_PER_HOST, parse_workers: int = None,
+                 recycle_after: int = None, queue_size: int = 16) -> dict:
+    """
+    Run fetch -> parse -> save as concurrent stages joined by bounded queues.
+
+    Instead of finishing one dataset before starting the next, documents
+    stream through three stages:
+
+        fetch threads --(parse queue)--> parse processes --(done queue)--> save thread
+
+    - Fetch: `fetch_workers` threads work through the items of every dataset
+      in order; the host's adaptive limiter in `get_retry` caps concurrency.
+    - Parse: a dispatcher hands fetched documents to a process pool, keeping
+      at most two documents per worker in flight. Workers are replaced after
+      `recycle_after` documents.
+    - Save: once all items of a dataset are parsed, its `on_done` runs on a
+      save thread while later datasets keep fetching and parsing.
+
+    The parse queue holds at most `queue_size` fetched-but-unparsed documents;
+    when parsing falls behind, fetch threads block on it (backpressure)
+    instead of piling up downloads. `on_fetched` and `on_parsed` callbacks run
+    on fetch threads and the calling thread respectively.
+
+    Args:
+        datasets (list[Dataset]): Datasets in the order they should be fed.
+        fetch_workers (int): Fetch threads.
+        parse_workers (int, optional): Parse processes. Defaults to os.cpu_count();
+            1 parses on the dispatcher thread.
+        recycle_after (int, optional): Documents per worker before it is replaced.
+        queue_size (int): Bound of the parse queue.
+    Returns:
+        dict: wall time, summed fetch / parse / save time, and parse pool
+            workers and utilisation
+    """
+    parse_workers = parse_workers or os.cpu_count() or 1
+    parse_q = queue.Queue(maxsize=queue_size)
+    done_q = queue.Queue()
+    save_q = queue.Queue()
+    abort = threading.Event()
+    errors = []
+    t_start = time.perf_counter()
+
+    def fetch_one(ds, item):
+        if abort.is_set():
+            return
+        try:
+            if ds.started is None:
+                ds.started = time.perf_counter()
+            path, ft = timed_fetch(ds.source, item)
+            ds.fetch_times[item] = ft
+            if ds.on_fetched is None or ds.on_fetched(item, path, ft) is not False:
+                parse_q.put((ds, item, path))  # blocks while the parse stage is behind
+            else:
+                done_q.put((ds, item, None))
+        except BaseException as e:
+            done_q.put((ds, item, e))
+
+    def dispatch(pool):
+        in_flight = threading.Semaphore(2 * parse_workers)
+
+        def finished(f, ds, item):
+            in_flight.release()
+            done_q.put((ds, item, f.exception() or f.result()))
+
+        while True:
+            job = parse_q.get()
+            if job is None:
+                return
+            if abort.is_set():
+                continue  # drain so blocked fetch threads can exit
+            ds, item, path = job
+            if pool is None:
+                try:
+                    done_q.put((ds, item, timed_parse(ds.source, path, item, ds.parse_ch)))
+                except BaseException as e:
+                    done_q.put((ds, item, e))
+                continue
+            in_flight.acquire()
+            future = pool.submit(timed_parse, ds.source, path, item, ds.parse_ch)
+            future.add_done_callback(lambda f, ds=ds, item=item: finished(f, ds, item))
+
+    def save_loop():
+        while True:
+            ds = save_q.get()
+            if ds is None:
+                return
+            if abort.is_set():
+                continue
+            try:
+                ds.save_time = ds.on_done()
+            except BaseException as e:
+                errors.append(e)
+                abort.set()
+                done_q.put((ds, None, e))
+            ds.finished = time.perf_counter()
+
+    pool = ProcessPoolExecutor(max_workers=parse_workers, max_tasks_per_child=recycle_after) if parse_workers > 1 else None
+    dispatcher = threading.Thread(target=dispatch, args=(pool,), daemon=True)
+    saver = threading.Thread(target=save_loop, daemon=True)
+    dispatcher.start()
+    saver.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as fetchers:
+            remaining = {}
+            for ds in datasets:
+                remaining[ds.name] = len(ds.items)
+                if not ds.items:
+                    ds.started = time.perf_counter()
+                    save_q.put(ds)
+                for item in ds.items:
+                    fetchers.submit(fetch_one, ds, item)
+
+            # Collect results on this thread; hand finished datasets to the saver
+            while any(remaining.values()):
+                ds, item, result = done_q.get()
+                if isinstance(result, BaseException):
+                    if result not in errors:
+                        errors.append(result)
+                    abort.set()
+                    fetchers.shutdown(wait=False, cancel_futures=True)
+                    break
+                if result is not None:
+                    data, pt = result
+                    ds.parse_times[item] = pt
+                    if ds.on_parsed:
+                        ds.on_parsed(item, data, pt)
+                remaining[ds.name] -= 1
+                if remaining[ds.name] == 0:
+                    save_q.put(ds)
+    except BaseException:
+        abort.set()
+        raise
+    finally:
+        parse_q.put(None)
+        dispatcher.join()
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=abort.is_set())
+        save_q.put(None)
+        saver.join()
+
+    if errors:
+        raise errors[0]
+
+    wall = time.perf_counter() - t_start
+    busy = sum(sum(ds.parse_times.values()) for ds in datasets)
+    return {
+        "wall": wall,
+        "fetch": sum(sum(ds.fetch_times.values()) for ds in datasets),
+        "parse": busy,
+        "save": sum(ds.save_time for ds in datasets),
+        "workers": parse_workers,
+        "utilisation": busy / (wall * parse_workers) if wall else 0.0,
+    }
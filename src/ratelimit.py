@@ -0,0 +1,95 @@
+import threading, time
+from urllib.parse import urlparse
+
+MAX_PER_HOST = 8
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency limit for one host (additive increase, multiplicative decrease).
+
+    The limit starts at `start` requests in flight and grows by one after
+    every `limit` successful responses, up to `max_limit`. It is halved when a
+    response is throttled (429), fails (5xx or connection error), or takes
+    more than `slow_factor` times the smoothed baseline latency. A
+    `Retry-After` from the server also pauses new requests to the host until
+    it has passed.
+    """
+    def __init__(self, start: int = 2, max_limit: int = MAX_PER_HOST, slow_factor: float = 2.0):
+        self.limit = start
+        self.max_limit = max_limit
+        self.slow_factor = slow_factor
+        self.in_flight = 0
+        self.baseline = None
+        self.paused_until = 0.0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self.stats = {"requests": 0, "decreases": 0, "throttled": 0, "peak": start}
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < self.limit:
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self.in_flight += 1
+
+    def release(self, latency: float, ok: bool = True, throttled: bool = False, retry_after: float = None):
+        """
+        Free a slot and adapt the limit to how the request went.
+
+        Args:
+            latency (float): Seconds the request took.
+            ok (bool): False for 5xx responses and connection errors.
+            throttled (bool): True if the server answered 429 at any point.
+            retry_after (float, optional): Seconds the server asked us to wait.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            self.stats["requests"] += 1
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            slow = self.baseline is not None and latency > self.slow_factor * self.baseline
+            self.stats["throttled"] += int(throttled)
+            if throttled or not ok or slow:
+                # Requests already in flight report the same congestion; back off once per round trip
+                now = time.monotonic()
+                if now - self._last_decrease > (self.baseline or latency):
+                    self.limit = max(1, self.limit // 2)
+                    self._last_decrease = now
+                    self.stats["decreases"] += 1
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+                    self.stats["peak"] = max(self.stats["peak"], self.limit)
+            if ok and not throttled:
+                # Smoothed latency of healthy responses
+                self.baseline = latency if self.baseline is None else 0.8 * self.baseline + 0.2 * latency
+            self._cond.notify_all()
+
+_limiters: dict[str, AIMDLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def limiter_for(url: str) -> AIMDLimiter:
+    """Return the shared limiter for the host of `url`."""
+    host = urlparse(url).netloc
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = AIMDLimiter()
+        return _limiters[host]
+
+def limiter_stats() -> dict[str, dict]:
+    """Per-host limiter counters plus the current limit."""
+    with _limiters_lock:
+        return {host: {**l.stats, "limit": l.limit} for host, l in _limiters.items()}
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds from a Retry-After header given in seconds (HTTP dates are ignored)."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
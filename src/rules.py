@@ -1,12 +1,16 @@
 from .base import Source
-from .utils import get_retry
+from .utils import HTS_HOST
+from .cache import DownloadCache
+from .store import default_store
 from .models import GeneralRule
+from .pdftext import PdfDocument
 from pathlib import Path
-import pdfplumber, re, json
+import re, json
 from typing import List
 from datetime import date
 
-BASE_URL = "https://hts.usitc.gov/reststop/file?release=currentRelease&filename=General%20Rules%20of%20Interpretation"
+BASE_URL = f"{HTS_HOST}/reststop/file?release=currentRelease&filename=General%20Rules%20of%20Interpretation"
+rules_cache = DownloadCache("pdf/general_rules")
 
 class GeneralRules(Source):
     def fetch(self) -> Path:
@@ -19,12 +23,7 @@ class GeneralRules(Source):
         out_dir.mkdir(parents=True, exist_ok=True)
         pdf_path = out_dir / f"general_rules.pdf"
 
-        resp = get_retry(BASE_URL)
-        resp.raise_for_status()
-
-        with open(pdf_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                f.write(chunk)
+        rules_cache.fetch("general_rules", BASE_URL, pdf_path)
         return pdf_path
 
     def parse(self, pdf_path: Path) -> dict[str, list[GeneralRule]]:
@@ -36,10 +35,8 @@ class GeneralRules(Source):
             dict[str, list[GeneralRule]]: Parsed structured rules.
         """
         lines_per_page = []
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                bbox = (0, 50, page.width, page.height - 50)
-                t = page.within_bbox(bbox).extract_text()
+        with PdfDocument(pdf_path) as doc:
+            for t in doc.page_texts(crop_top=50, crop_bottom=50):
                 if not t:
                     continue
                 lines = [line.strip() for line in t.split("\n") if line.strip()]
@@ -144,8 +141,4 @@ class GeneralRules(Source):
             else:
                 data[key] = value
 
-        with open(versioned_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-
-        with open(latest_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+        default_store.save_text(json.dumps(data, indent=2, ensure_ascii=False), latest_path, versioned_path)
\ No newline at end of file
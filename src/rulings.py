@@ -1,7 +1,8 @@
 from .base import Source
 from .models import Ruling
 from .utils import get_retry
-import re, time, json, pdfplumber, win32com.client
+from .pdftext import PdfDocument
+import re, time, json, win32com.client
 from pathlib import Path
 from playwright.sync_api import sync_playwright
 from typing import List
@@ -17,8 +18,8 @@ def extract_text(file: Path) -> str:
         str: Extracted text content.
     """
     if file.suffix.lower() == ".pdf":
-        with pdfplumber.open(file) as pdf:
-            return "\n".join(page.extract_text() or "" for page in pdf.pages)
+        with PdfDocument(file) as doc:
+            return "\n".join(t or "" for t in doc.page_texts(0, 0))
 
     elif file.suffix.lower() == ".doc":
         # Use COM automation to extract text from legacy Word documents
@@ -0,0 +1,268 @@
+import hashlib, json, os, sys
+from pathlib import Path
+from typing import Iterable, Iterator, List
+from .models import Chapter, GeneralNote, HTSData, Section, SectionNote
+from .validation import validate_json
+
+SHARD_DIR = Path("data/hts/chapters")
+MANIFEST_NAME = "hts_manifest.json"
+
+def chapter_filename(ch_number: str) -> str:
+    """File name of a chapter shard, zero-padded so files sort in schedule order."""
+    return f"chapter_{int(ch_number):02d}.json" if str(ch_number).isdigit() else f"chapter_{ch_number}.json"
+
+def dump_compact(obj) -> bytes:
+    """Compact UTF-8 JSON, the encoding used for every shard."""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _write_if_changed(path: Path, data: bytes, old_hash: str | None) -> tuple[dict, bool]:
+    """Write `data` unless the file already holds it; returns its manifest entry and whether it was written."""
+    digest = hashlib.sha256(data).hexdigest()
+    entry = {"file": path.name, "bytes": len(data), "sha256": digest}
+    if digest == old_hash and path.exists():
+        return entry, False
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return entry, True
+
+def read_manifest(out_dir: str | Path = SHARD_DIR) -> dict | None:
+    """The shard manifest in `out_dir`, or None if there is none."""
+    path = Path(out_dir) / MANIFEST_NAME
+    return json.loads(path.read_bytes()) if path.exists() else None
+
+def stale_shards(sources: dict, out_dir: str | Path = SHARD_DIR) -> set[str]:
+    """
+    Chapters in `sources` whose shard is missing or was written from other inputs.
+
+    Args:
+        sources (dict): Chapter number -> hash of the inputs it is built from,
+            as recorded by `write_shards(..., sources=...)`.
+        out_dir (str | Path): Shard directory.
+    """
+    out_dir = Path(out_dir)
+    manifest = read_manifest(out_dir)
+    current = set()
+    if manifest:
+        current = {c["ch_number"] for s in manifest["sections"] for c in s["chapters"]
+                   if c.get("source") is not None and c.get("source") == sources.get(c["ch_number"])
+                   and (out_dir / c["file"]).exists()}
+    return {str(c) for c in sources} - current
+
+def write_shards(full_data: HTSData | dict, out_dir: str | Path = SHARD_DIR, unchanged: Iterable = (),
+                 sources: dict = None) -> dict:
+    """
+    Write the schedule as one compact JSON file per chapter plus a manifest.
+
+    The manifest holds the section numbers, titles and section notes, and
+    for every chapter its title, file, byte size and SHA-256, so a reader
+    can list the schedule without opening any chapter. With `sources`, each
+    entry also records the hash of the inputs its shard was built from, which
+    `stale_shards` checks before a shard is reused. Chapters whose bytes
+    match the previous manifest are not rewritten, and shards of chapters
+    that no longer exist are removed. The manifest is replaced last, so
+    readers see either the old or the new layout.
+
+    Args:
+        full_data (HTSData | dict): Combined schedule, as built by `combine()`,
+            or its `model_dump()`.
+        out_dir (str | Path): Shard directory.
+        unchanged (iterable, optional): Chapters whose existing shard is kept
+            as is; their entries in `full_data` only need `ch_number` and `title`.
+        sources (dict, optional): Chapter number -> input hash, see `stale_shards`.
+    Returns:
+        dict: Counts of chapters written and reused.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST_NAME
+    data = full_data.model_dump() if isinstance(full_data, HTSData) else full_data
+    unchanged = {str(c) for c in unchanged}
+    sources = sources or {}
+    old_entries = {}
+    old = read_manifest(out_dir)
+    if old:
+        old_entries = {c["file"]: c for s in old["sections"] for c in s["chapters"]}
+        old_entries["general_notes.json"] = old.get("general_notes") or {}
+
+    stats = {"written": 0, "reused": 0}
+    general, _ = _write_if_changed(
+        out_dir / "general_notes.json",
+        dump_compact(data["general_notes"]),
+        old_entries.get("general_notes.json", {}).get("sha256"),
+    )
+    sections = []
+    for section in data["sections"]:
+        chapters = []
+        for chapter in section["chapters"] or []:
+            name = chapter_filename(chapter["ch_number"])
+            old_entry = old_entries.get(name)
+            if chapter["ch_number"] in unchanged and old_entry and (out_dir / name).exists():
+                entry, written = {k: old_entry[k] for k in ("file", "bytes", "sha256")}, False
+            else:
+                entry, written = _write_if_changed(out_dir / name, dump_compact(chapter), (old_entry or {}).get("sha256"))
+            stats["written" if written else "reused"] += 1
+            chapters.append({"ch_number": chapter["ch_number"], "title": chapter["title"], **entry,
+                             "source": sources.get(chapter["ch_number"])})
+        sections.append({
+            "sec_number": section["sec_number"],
+            "title": section["title"],
+            "notes": section["notes"],
+            "chapters": chapters,
+        })
+
+    manifest = {"format": 1, "general_notes": general, "sections": sections}
+    tmp = manifest_path.with_name(MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, manifest_path)
+
+    keep = {c["file"] for s in sections for c in s["chapters"]} | {"general_notes.json"}
+    for path in out_dir.glob("chapter_*.json"):
+        if path.name not in keep:
+            path.unlink()
+    return stats
+
+class LazyHTSData:
+    """
+    Chapter-sharded view of the schedule that loads chapters on demand.
+
+    Only the manifest is read up front; `chapter()` reads and validates one
+    shard the first time it is asked for and keeps it. Sections, chapter
+    titles and section notes come straight from the manifest, so listing the
+    schedule opens no chapter files. `materialize()` builds the full
+    `HTSData` when everything is needed after all.
+
+    Args:
+        root (str | Path): Shard directory written by `write_shards`.
+    """
+    def __init__(self, root: str | Path = SHARD_DIR):
+        self.root = Path(root)
+        manifest_path = self.root / MANIFEST_NAME
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"{manifest_path} not found; run `python -m src.shards build`")
+        self.manifest = json.loads(manifest_path.read_bytes())
+        self._entries = {c["ch_number"]: (s, c) for s in self.manifest["sections"] for c in s["chapters"]}
+        self._chapters: dict[str, Chapter] = {}
+        self._general_notes = None
+
+    @property
+    def sections(self) -> list[dict]:
+        """Manifest entries of every section (numbers, titles, notes, chapter entries)."""
+        return self.manifest["sections"]
+
+    def chapter_numbers(self) -> list[str]:
+        """All chapter numbers, in schedule order."""
+        return list(self._entries)
+
+    def section_of(self, ch_number: str | int) -> dict:
+        """Manifest entry of the section holding a chapter."""
+        return self._entries[str(ch_number)][0]
+
+    @property
+    def loaded(self) -> list[str]:
+        """Chapters read from disk so far."""
+        return list(self._chapters)
+
+    def chapter(self, ch_number: str | int, verify: bool = False) -> Chapter:
+        """
+        One chapter, read from its shard on first use.
+
+        Args:
+            ch_number (str | int): Chapter number.
+            verify (bool): Check the shard's SHA-256 against the manifest.
+        Raises:
+            KeyError: If the chapter is not in the manifest.
+            ValueError: If `verify` is set and the shard does not match.
+        """
+        ch_number = str(ch_number)
+        if ch_number not in self._chapters:
+            _, entry = self._entries[ch_number]
+            raw = (self.root / entry["file"]).read_bytes()
+            if verify and hashlib.sha256(raw).hexdigest() != entry["sha256"]:
+                raise ValueError(f"{entry['file']} does not match the manifest")
+            self._chapters[ch_number] = validate_json(Chapter, raw, strict=True)
+        return self._chapters[ch_number]
+
+    def chapters(self, numbers: Iterable = None) -> Iterator[Chapter]:
+        """Chapters in `numbers` (default: all), loaded one by one."""
+        for ch in (self.chapter_numbers() if numbers is None else numbers):
+            yield self.chapter(ch)
+
+    def release(self, ch_number: str | int = None):
+        """Drop one loaded chapter (or all of them) from memory."""
+        if ch_number is None:
+            self._chapters.clear()
+        else:
+            self._chapters.pop(str(ch_number), None)
+
+    @property
+    def general_notes(self) -> list[GeneralNote]:
+        if self._general_notes is None:
+            raw = (self.root / self.manifest["general_notes"]["file"]).read_bytes()
+            self._general_notes = validate_json(List[GeneralNote], raw, strict=True)
+        return self._general_notes
+
+    def section(self, sec_number: str, chapters: Iterable = None) -> Section:
+        """A section with its chapters (or only those in `chapters`) materialised."""
+        entry = next(s for s in self.sections if s["sec_number"] == sec_number)
+        wanted = None if chapters is None else {str(c) for c in chapters}
+        return Section(
+            sec_number=entry["sec_number"],
+            title=entry["title"],
+            notes=SectionNote.model_validate(entry["notes"]) if entry["notes"] else None,
+            chapters=[self.chapter(c["ch_number"]) for c in entry["chapters"] if wanted is None or c["ch_number"] in wanted],
+        )
+
+    def to_dict(self, chapters: Iterable = None, general_notes: bool = False) -> dict:
+        """
+        The schedule in the shape of `hts_full`, holding only the chapters
+        asked for (default: all). Sections without any of them are left out.
+        """
+        wanted = None if chapters is None else {str(c) for c in chapters}
+        sections = []
+        for entry in self.sections:
+            numbers = [c["ch_number"] for c in entry["chapters"] if wanted is None or c["ch_number"] in wanted]
+            if numbers or wanted is None:
+                sections.append({
+                    "sec_number": entry["sec_number"],
+                    "title": entry["title"],
+                    "notes": entry["notes"],
+                    "chapters": [self.chapter(n).model_dump() for n in numbers],
+                })
+        return {
+            "general_notes": [n.model_dump() for n in self.general_notes] if general_notes else [],
+            "sections": sections,
+        }
+
+    def materialize(self) -> HTSData:
+        """The whole schedule as `HTSData` (loads every chapter)."""
+        return HTSData(
+            general_notes=self.general_notes,
+            sections=[self.section(s["sec_number"]) for s in self.sections],
+        )
+
+def main(argv=None):
+    """
+    Usage:
+        python -m src.shards build [HTS_FULL_JSON]   # shard an existing hts_full file
+        python -m src.shards CH [CH ...]             # spot-check chapters
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        raise SystemExit(main.__doc__)
+    if argv[0] == "build":
+        path = Path(argv[1] if len(argv) > 1 else "data/hts/hts_full_latest.json")
+        stats = write_shards(validate_json(HTSData, path.read_bytes()))
+        print(f"{SHARD_DIR}: {stats['written']} chapters written, {stats['reused']} unchanged")
+        return
+    hts = LazyHTSData()
+    for ch in argv:
+        chapter = hts.chapter(ch, verify=True)
+        section = hts.section_of(ch)
+        rows = len(chapter.table.rows) if chapter.table else 0
+        notes = len(chapter.notes.notes) if chapter.notes else 0
+        print(f"Section {section['sec_number']} / Chapter {chapter.ch_number}: {chapter.title} "
+              f"({rows} tariff rows, {notes} notes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+import hashlib, json, os, re, shutil, sys, threading, zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+
+STORE_ROOT = Path("store")
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MIN_CHUNK = 16 * 1024
+TARGET_CHUNK = 64 * 1024
+MAX_CHUNK = 256 * 1024
+DATED_RE = re.compile(r"_v\d{4}-\d{2}-\d{2}(?=\.[^.]+$)")
+
+def _records(f, suffix: str) -> Iterator[bytes]:
+    """
+    Split a file into records that chunk boundaries may fall between:
+    the header and rows of a `.npy` array, lines of anything else. Records
+    longer than MAX_CHUNK (e.g. compact one-line JSON) are cut into pieces.
+    """
+    if suffix == ".npy":
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, _, dtype = read_header(f)
+        header_len = f.tell()
+        f.seek(0)
+        yield f.read(header_len)
+        row = dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64)) if len(shape) > 1 else MAX_CHUNK
+        size = max(1, min(row, MAX_CHUNK))
+        for block in iter(lambda: f.read(size), b""):
+            yield block
+        return
+    for line in f:
+        for start in range(0, len(line), MAX_CHUNK):
+            yield line[start:start + MAX_CHUNK]
+
+def iter_chunks(f, suffix: str = "") -> Iterator[bytes]:
+    """
+    Content-defined chunks of a file.
+
+    A chunk ends after a record whose CRC-32 hits a target that scales with
+    the record length (giving ~TARGET_CHUNK chunks on average), once the
+    chunk holds at least MIN_CHUNK bytes, or before it would pass
+    MAX_CHUNK. Boundaries depend only on nearby content, so an edit in one
+    chapter or a few changed embedding rows leave the chunks of the rest of
+    the file, and their hashes, unchanged between versions.
+    """
+    buf, size = [], 0
+    for record in _records(f, suffix):
+        if size and size + len(record) > MAX_CHUNK:
+            yield b"".join(buf)
+            buf, size = [], 0
+        buf.append(record)
+        size += len(record)
+        every = max(1, TARGET_CHUNK // max(1, len(record)))
+        if size >= MIN_CHUNK and zlib.crc32(record) % every == 0:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+class ObjectStore:
+    """
+    Content-addressed store for versioned outputs.
+
+    Every saved version is split into content-defined chunks (`iter_chunks`)
+    that are stored once each, zlib-compressed, under `chunks/`; an object
+    manifest under `objects/` lists the chunks of one file version, keyed by
+    the SHA-256 of the whole file. `refs.json` maps every saved name, both
+    `_latest` and dated `_v{date}` names, to the object it holds. Names are
+    recorded relative to the repository root (`ref_key`), so `data/...` and
+    an absolute path to the same file are one ref.
+
+    On disk, the `_latest` file and each dated name are independent files;
+    a dated file is never removed or rewritten by a later save. Only
+    `gc(keep=N)` prunes dated files beyond the newest N. A pruned version
+    can no longer be restored, while one deleted by hand is still in the
+    store and `checkout` writes it back. `gc` drops chunks and objects no
+    ref points to.
+    """
+    def __init__(self, root: str | Path = STORE_ROOT):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    # ---------- Objects ----------
+    def _chunk_path(self, digest: str) -> Path:
+        return self.root / "chunks" / digest[:2] / digest
+
+    def _object_path(self, oid: str) -> Path:
+        return self.root / "objects" / f"{oid}.json"
+
+    def put_file(self, path: str | Path, suffix: str = None) -> str:
+        """
+        Store the contents of a file; returns its object id (SHA-256 of the bytes).
+
+        Only chunks not already in the store are written. `suffix` picks the
+        chunking (".npy" splits on array rows) when the file name does not
+        carry it, e.g. for temporary files.
+        """
+        path = Path(path)
+        whole = hashlib.sha256()
+        chunks = []
+        with open(path, "rb") as f:
+            for chunk in iter_chunks(f, suffix or path.suffix):
+                whole.update(chunk)
+                digest = hashlib.sha256(chunk).hexdigest()
+                chunks.append([digest, len(chunk)])
+                dest = self._chunk_path(digest)
+                if not dest.exists():
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = dest.with_name(f"{digest}.{threading.get_ident()}.tmp")
+                    tmp.write_bytes(zlib.compress(chunk, 1))
+                    os.replace(tmp, dest)
+        oid = whole.hexdigest()
+        obj_path = self._object_path(oid)
+        if not obj_path.exists():
+            obj_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = obj_path.with_name(f"{oid}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps({"size": sum(n for _, n in chunks), "chunks": chunks}), encoding="utf-8")
+            os.replace(tmp, obj_path)
+        return oid
+
+    def read_object(self, oid: str) -> Iterator[bytes]:
+        """The bytes of an object, chunk by chunk."""
+        obj = json.loads(self._object_path(oid).read_text(encoding="utf-8"))
+        for digest, _ in obj["chunks"]:
+            yield zlib.decompress(self._chunk_path(digest).read_bytes())
+
+    # ---------- Refs ----------
+    def refs(self) -> dict:
+        path = self.root / "refs.json"
+        if not path.exists():
+            return {}
+        refs = {}
+        for name, ref in json.loads(path.read_text(encoding="utf-8")).items():
+            # Keys written before they were canonical may be absolute
+            if "latest" in ref:
+                ref["latest"] = ref_key(ref["latest"])
+            refs[ref_key(name)] = ref
+        return refs
+
+    def _write_refs(self, refs: dict):
+        path = self.root / "refs.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name("refs.json.tmp")
+        tmp.write_text(json.dumps(refs, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, path)
+
+    # ---------- Saving ----------
+    def save_file(self, tmp_path: str | Path, latest_path: str | Path, versioned_path: str | Path = None) -> str:
+        """
+        Move a fully written temporary file into place as `latest_path`,
+        record it in the store and point `versioned_path` at it.
+
+        Args:
+            tmp_path (str | Path): The new content, in the same directory as `latest_path`.
+            latest_path (str | Path): Working-tree `_latest` name.
+            versioned_path (str | Path, optional): Dated name for this version.
+        Returns:
+            str: Object id of the content.
+        """
+        tmp_path, latest_path = Path(tmp_path), Path(latest_path)
+        oid = self.put_file(tmp_path, latest_path.suffix)
+        if versioned_path is not None:
+            # A copy, not a link: the dated file must not change with `_latest`
+            versioned_path = Path(versioned_path)
+            tmp_copy = versioned_path.with_name(versioned_path.name + ".tmp")
+            shutil.copyfile(tmp_path, tmp_copy)
+            os.replace(tmp_copy, versioned_path)
+        os.replace(tmp_path, latest_path)
+        with self._lock:
+            refs = self.refs()
+            now = datetime.now().isoformat(timespec="seconds")
+            refs[ref_key(latest_path)] = {"object": oid, "saved": now}
+            if versioned_path is not None:
+                refs[ref_key(versioned_path)] = {"object": oid, "saved": now, "latest": ref_key(latest_path)}
+            self._write_refs(refs)
+        return oid
+
+    def save_bytes(self, data: bytes, latest_path: str | Path, versioned_path: str | Path = None) -> str:
+        """`save_file` for content already in memory."""
+        latest_path = Path(latest_path)
+        latest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = latest_path.with_name(latest_path.name + ".tmp")
+        tmp.write_bytes(data)
+        return self.save_file(tmp, latest_path, versioned_path)
+
+    def save_text(self, text: str, latest_path: str | Path, versioned_path: str | Path = None) -> str:
+        """`save_file` for a string, written as UTF-8."""
+        return self.save_bytes(text.encode("utf-8"), latest_path, versioned_path)
+
+    def read(self, name: str | Path) -> bytes:
+        """The bytes saved under `name`, without writing them to disk."""
+        ref = self.refs().get(ref_key(name))
+        if ref is None:
+            raise KeyError(f"{name} is not in the store")
+        return b"".join(self.read_object(ref["object"]))
+
+    def checkout(self, name: str | Path, dest: str | Path = None) -> Path:
+        """
+        Write the version recorded under `name` (e.g. an older dated file) back to disk.
+
+        Args:
+            name (str | Path): Saved name, relative to the repository root or absolute.
+            dest (str | Path, optional): Where to write it; defaults to `name`.
+        """
+        ref = self.refs().get(ref_key(name))
+        if ref is None:
+            raise KeyError(f"{name} is not in the store")
+        dest = Path(dest) if dest else ref_path(ref_key(name))
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + ".tmp")
+        with open(tmp, "wb") as f:
+            for chunk in self.read_object(ref["object"]):
+                f.write(chunk)
+        os.replace(tmp, dest)
+        return dest
+
+    def adopt(self, paths) -> int:
+        """
+        Record dated copies written before the store existed in it.
+
+        Each `*_v{date}.*` file is stored and recorded as a dated version of
+        its `_latest` sibling; the file itself stays on disk until
+        `gc(keep=N)` prunes it. Returns the number adopted.
+        """
+        adopted = 0
+        for path in map(Path, paths):
+            if not DATED_RE.search(path.name) or not path.is_file():
+                continue
+            latest = path.with_name(DATED_RE.sub("_latest", path.name))
+            with self._lock:
+                refs = self.refs()
+                name, latest_name = ref_key(path), ref_key(latest)
+                if name in refs:
+                    continue
+                refs[name] = {"object": self.put_file(path), "latest": latest_name,
+                              "saved": datetime.fromtimestamp(path.stat().st_mtime).isoformat(timespec="seconds")}
+                if latest_name not in refs and latest.exists():
+                    refs[latest_name] = {"object": self.put_file(latest), "saved": refs[name]["saved"]}
+                self._write_refs(refs)
+            adopted += 1
+        return adopted
+
+    # ---------- Maintenance ----------
+    def gc(self, keep: int = None) -> dict:
+        """
+        Delete objects and chunks that no ref points to.
+
+        Args:
+            keep (int, optional): First prune all but the `keep` newest dated
+                versions of each name: their refs are forgotten and their
+                files deleted. This is the only place dated files are removed.
+        Returns:
+            dict: Refs, objects and chunks removed and bytes freed.
+        """
+        stats = {"refs": 0, "objects": 0, "chunks": 0, "bytes": 0}
+        with self._lock:
+            refs = self.refs()
+            if keep is not None:
+                by_latest = {}
+                for name, ref in refs.items():
+                    if "latest" in ref:
+                        by_latest.setdefault(ref["latest"], []).append(name)
+                for names in by_latest.values():
+                    for name in sorted(names, reverse=True)[keep:]:
+                        ref_path(name).unlink(missing_ok=True)
+                        del refs[name]
+                        stats["refs"] += 1
+                self._write_refs(refs)
+
+            live_objects = {ref["object"] for ref in refs.values()}
+            live_chunks = set()
+            for obj_path in (self.root / "objects").glob("*.json"):
+                oid = obj_path.stem
+                if oid in live_objects:
+                    live_chunks.update(d for d, _ in json.loads(obj_path.read_text(encoding="utf-8"))["chunks"])
+                else:
+                    obj_path.unlink()
+                    stats["objects"] += 1
+            for chunk_path in (self.root / "chunks").glob("*/*"):
+                if chunk_path.name not in live_chunks:
+                    stats["bytes"] += chunk_path.stat().st_size
+                    chunk_path.unlink()
+                    stats["chunks"] += 1
+        return stats
+
+    def footprint(self) -> dict:
+        """
+        Logical vs real storage of everything saved through the store.
+
+        Returns:
+            dict: `logical` – bytes if every ref were a full copy (the old layout);
+                `objects` – bytes of the distinct versions; `chunks_raw` /
+                `chunks_stored` – distinct chunk bytes before / after compression;
+                `working` – bytes of the ref files present on disk; plus ref,
+                object and chunk counts.
+        """
+        refs = self.refs()
+        sizes, chunk_sizes = {}, {}
+        for obj_path in (self.root / "objects").glob("*.json"):
+            obj = json.loads(obj_path.read_text(encoding="utf-8"))
+            sizes[obj_path.stem] = obj["size"]
+            chunk_sizes.update({d: n for d, n in obj["chunks"]})
+        stored = sum(p.stat().st_size for p in (self.root / "chunks").glob("*/*"))
+        inodes = {}
+        for name in refs:
+            p = ref_path(name)
+            if p.exists():
+                st = p.stat()
+                inodes[(st.st_dev, st.st_ino)] = st.st_size
+        return {
+            "refs": len(refs),
+            "objects": len(sizes),
+            "chunks": len(chunk_sizes),
+            "logical": sum(sizes.get(ref["object"], 0) for ref in refs.values()),
+            "objects_bytes": sum(sizes.values()),
+            "chunks_raw": sum(chunk_sizes.values()),
+            "chunks_stored": stored,
+            "working": sum(inodes.values()),
+        }
+
+def ref_key(path: str | Path) -> str:
+    """Canonical ref name of a path: relative to the repository root if inside it, else absolute."""
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(REPO_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+def ref_path(key: str) -> Path:
+    """The file a ref name stands for."""
+    return REPO_ROOT / key
+
+def link_or_copy(src: Path, dest: Path):
+    """Point `dest` at the bytes of `src` with a hardlink, copying if links are unsupported."""
+    tmp = dest.with_name(dest.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        os.link(src, tmp)
+    except OSError:
+        tmp.write_bytes(src.read_bytes())
+    os.replace(tmp, dest)
+
+default_store = ObjectStore()
+
+def main(argv=None):
+    """
+    Usage:
+        python -m src.store size                 # logical vs deduplicated footprint
+        python -m src.store gc [--keep N]        # drop unreferenced chunks (and prune all but N dated files)
+        python -m src.store checkout NAME [DEST] # restore a saved version, e.g. data/tables/tariff_tables_all_v2025-01-01.json
+        python -m src.store adopt PATH...        # record pre-existing dated copies in the store
+        python -m src.store list [PATTERN]       # saved names and their objects
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    cmd = argv[0] if argv else "size"
+    store = default_store
+    if cmd == "size":
+        fp = store.footprint()
+        mb = lambda n: f"{n / 1024 / 1024:.1f} MB"
+        print(f"{fp['refs']} names -> {fp['objects']} versions -> {fp['chunks']} chunks")
+        print(f"As full copies: {mb(fp['logical'])}; distinct versions: {mb(fp['objects_bytes'])}; "
+              f"distinct chunks: {mb(fp['chunks_raw'])} ({mb(fp['chunks_stored'])} compressed); working files: {mb(fp['working'])}")
+    elif cmd == "gc":
+        keep = int(argv[argv.index("--keep") + 1]) if "--keep" in argv else None
+        stats = store.gc(keep)
+        print(f"Removed {stats['refs']} refs, {stats['objects']} objects, {stats['chunks']} chunks ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+    elif cmd == "checkout" and len(argv) > 1:
+        print(store.checkout(argv[1], argv[2] if len(argv) > 2 else None))
+    elif cmd == "adopt":
+        print(f"Adopted {store.adopt(argv[1:])} dated files")
+    elif cmd == "list":
+        pattern = argv[1] if len(argv) > 1 else ""
+        for name, ref in sorted(store.refs().items()):
+            if pattern in name:
+                print(f"{ref['object'][:12]}  {ref['saved']}  {name}{'' if ref_path(name).exists() else '  (in store only)'}")
+    else:
+        print(main.__doc__)
+
+if __name__ == "__main__":
+    main()
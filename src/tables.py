@@ -1,20 +1,97 @@
-import json, re
+import filecmp, os, threading
 from .base import Source  
+from typing import List
 from .models import TariffRow, TariffTable 
 from datetime import date
 from pathlib import Path
-from .utils import get_retry, deduplicate
+from .utils import HTS_HOST
+from .cache import DownloadCache
+from .store import default_store
+from .jsonstream import iter_json_array, JsonArrayWriter
+from .validation import validate_json
+
+# Serialises the one-off bulk download between fetch threads
+_bulk_lock = threading.Lock()
+
+def row_chapter(htsno: str | None) -> int | None:
+    """Chapter number from the first two digits of an HTS number, if it has them."""
+    digits = (htsno or "")[:2]
+    return int(digits) if digits.isdigit() and len(digits) == 2 else None
 
 class TariffTableSource(Source):
     """
     Source class to fetch, parse, and save Tariff Table rows for a given chapter.
+
+    In bulk mode (the default) the export endpoint is called once per range in
+    `BULK_RANGES` (by default the whole 0100–9999 span), the response is
+    streamed to disk, and its rows are split into per-chapter files by the
+    `htsno` prefix. `fetch(chapter)` then just returns that chapter's file.
+    With `bulk=False` every chapter is requested separately.
     """
 
-    BASE_URL = "https://hts.usitc.gov/reststop/exportList"
+    BASE_URL = f"{HTS_HOST}/reststop/exportList"
+    BULK_RANGES = [(100, 9999)]
+    cache = DownloadCache("json/tables", suffix=".json")
+
+    def __init__(self, bulk: bool = True):
+        self.bulk = bulk
+        self._chapter_paths = None
+
+    def export_url(self, start: int, end: int) -> str:
+        return f"{self.BASE_URL}?from={start:04d}&to={end:04d}&format=JSON&styles=true"
+
+    def fetch_bulk(self, tables_dir: Path = Path("json/tables")) -> dict[int, Path]:
+        """
+        Download every range in `BULK_RANGES` and split the rows into per-chapter files.
+
+        Rows without an `htsno` (continuation and heading text) stay with the
+        chapter of the row before them. Chapters with no rows get an empty list.
+
+        Returns:
+            dict[int, Path]: Chapter number -> `chapter_{n}_table.json`.
+        """
+        tables_dir.mkdir(parents=True, exist_ok=True)
+        # Rows are streamed from the export straight into per-chapter temp files
+        files, writers = {}, {}
+        chapter = None
+        try:
+            for start, end in self.BULK_RANGES:
+                export_path = tables_dir / f"export_{start:04d}_{end:04d}.json"
+                self.cache.fetch(f"export_{start:04d}_{end:04d}", self.export_url(start, end), export_path)
+                for row in iter_json_array(export_path):
+                    chapter = row_chapter(row.get("htsno")) or chapter
+                    if chapter is None:
+                        continue
+                    if chapter not in writers:
+                        files[chapter] = open(tables_dir / f"chapter_{chapter}_table.json.tmp", "w", encoding="utf-8")
+                        writers[chapter] = JsonArrayWriter(files[chapter])
+                    writers[chapter].write(row)
+        finally:
+            for ch, f in files.items():
+                writers[ch].close()
+                f.close()
+
+        paths = {}
+        for ch in range(1, 100):
+            path = tables_dir / f"chapter_{ch}_table.json"
+            tmp = path.with_name(path.name + ".tmp")
+            if ch not in writers:
+                tmp.write_text("[]", encoding="utf-8")
+            # Leave unchanged chapters untouched so their hash (and mtime) stays stable
+            if path.exists() and filecmp.cmp(tmp, path, shallow=False):
+                tmp.unlink()
+            else:
+                os.replace(tmp, path)
+            paths[ch] = path
+        return paths
 
     def fetch(self, chapter_num: int, json_path: str = None) -> str:
         """
-        Download the JSON for a chapter tariff table and store it under json/tables.
+        Return the JSON for a chapter tariff table, stored under json/tables.
+
+        In bulk mode the first call downloads and splits the whole export;
+        later calls return the chapter's split file. Otherwise the chapter's
+        range is downloaded on its own.
 
         Args:
             chapter_num (int): Chapter number to download.
@@ -27,6 +104,12 @@ class TariffTableSource(Source):
         tables_dir = Path("json/tables")
         tables_dir.mkdir(parents=True, exist_ok=True)
 
+        if self.bulk and json_path is None:
+            with _bulk_lock:
+                if self._chapter_paths is None:
+                    self._chapter_paths = self.fetch_bulk(tables_dir)
+            return str(self._chapter_paths[chapter_num])
+
         if json_path is None:
             json_path = tables_dir / f"chapter_{chapter_num}_table.json"
         else:
@@ -38,37 +121,38 @@ class TariffTableSource(Source):
         if end > 9999:
             end = 9999
 
-        url = f"{self.BASE_URL}?from={start:04d}&to={end:04d}&format=JSON&styles=true"
-        r = get_retry(url)
-        r.raise_for_status()
-
-        with open(json_path, "w", encoding="utf-8") as f:
-            f.write(r.text)
+        self.cache.fetch(f"chapter_{chapter_num}_table", self.export_url(start, end), json_path)
 
         return str(json_path)
 
-    def parse(self, json_path: str) -> TariffTable:
+    def parse(self, json_path: str, chapter_num: int) -> TariffTable:
         """
         Parse a downloaded tariff table JSON file into a TariffTable object.
 
-        Automatically detects the chapter number from the filename if possible.
-        """
-        # auto-detect chapter number from filename
-        m = re.search(r"chapter_(\d+)_table\.json", json_path)
-        chapter_num = m.group(1) if m else "?"
-
-        # load JSON
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        The chapter file is validated from its raw bytes in one pydantic-core
+        pass, which is faster than validating rows one by one from the
+        stream. Memory is therefore bounded per chapter rather than per row,
+        which costs nothing extra since the returned TariffTable holds all of
+        the chapter's rows anyway; the whole export is never loaded (see
+        `fetch_bulk`, which splits it by streaming).
 
-        # build rows
-        rows = [TariffRow(**row) for row in data]
+        Args:
+            json_path (str): Chapter JSON returned by `fetch`.
+            chapter_num (int): Chapter the rows belong to.
+        """
+        # validate the chapter's raw bytes in one pass (no intermediate dicts)
+        rows = validate_json(List[TariffRow], Path(json_path).read_bytes())
 
-        return TariffTable(chapter_number=chapter_num, rows=rows)
+        return TariffTable(chapter_number=str(chapter_num), rows=rows)
 
     def save(self, tables: list[TariffTable], filepath: str = None, version: str = None):
-        if tables:
-            tables = deduplicate(tables, "chapter_number")
+        """
+        Write tariff tables to the versioned and latest JSON files.
+
+        Tables are serialised and written one at a time (first occurrence of
+        each chapter wins), so `tables` can be any iterable, including a
+        generator, and the full JSON text is never built in memory.
+        """
         # default values
         version = version or date.today().isoformat()
         base_filename = filepath or "tariff_tables_all"
@@ -81,12 +165,17 @@ class TariffTableSource(Source):
         versioned_path = data_dir / f"{base_filename}_v{version}.json"
         latest_path = data_dir / f"{base_filename}_latest.json"
 
-        # convert to list of dicts
-        payload = [t.model_dump() for t in tables]
-
-        # write both files
-        text = json.dumps(payload, indent=2, ensure_ascii=False)
-        versioned_path.write_text(text, encoding="utf-8")
-        latest_path.write_text(text, encoding="utf-8")
+        # write the file incrementally, then store it under both names
+        seen = set()
+        tmp = latest_path.with_name(latest_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            writer = JsonArrayWriter(f, indent=2)
+            for t in tables:
+                if t.chapter_number in seen:
+                    continue
+                seen.add(t.chapter_number)
+                writer.write(t.model_dump())
+            writer.close()
+        default_store.save_file(tmp, latest_path, versioned_path)
 
         return str(versioned_path)
@@ -1,26 +1,33 @@
-import requests, json
+import requests, hashlib, json, os, re, threading, time
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from .ratelimit import limiter_for, parse_retry_after
+from .validation import load_models
+from .shards import write_shards
+from .store import default_store
+from .jsonstream import iter_json_array
 from .models import Chapter, Section, HTSData, SectionNote, ChapterNote, AdditionalUSNotes, TariffTable, GeneralNote
 from pathlib import Path
 from datetime import date
 
-def get_retry(url: str, retries: int = 5, backoff_factor: float = 0.5, timeout: int = 30, **kwargs) -> requests.Response:
+# USITC host; point HTS_HOST at a local stand-in (see standin.py) to test against fixtures
+HTS_HOST = os.environ.get("HTS_HOST", "https://hts.usitc.gov").rstrip("/")
+POOL_SIZE = 10
+
+_session = None
+_session_config = {"retries": 5, "backoff_factor": 0.5, "pool_size": POOL_SIZE}
+
+def build_session(retries: int = 5, backoff_factor: float = 0.5, pool_size: int = POOL_SIZE) -> requests.Session:
     """
-    Perform a GET request with automatic retries and exponential backoff.
+    Build a requests.Session with a pooled HTTPAdapter and the retry policy.
 
     Retry logic:
         sleep_time = backoff_factor * (2 ** (retry_number - 1))
+        429 and 503 responses with a Retry-After header wait that long instead.
     Args:
-        url (str): The full URL to fetch.
         retries (int, optional): Maximum number of retry attempts. Defaults to 5.
         backoff_factor (float, optional): Base factor for exponential backoff. Defaults to 0.5.
-        timeout (int, optional): Timeout in seconds for the request. Defaults to 30.
-        **kwargs: Additional keyword arguments passed directly to `requests.get()`.
-            Examples:
-                - stream=True (for large files)
-                - headers={'User-Agent': '...'}
-                - params={'key': 'value'}
+        pool_size (int, optional): Connections kept alive per host. Defaults to POOL_SIZE.
     """
     session = requests.Session()
     retry = Retry(
@@ -28,17 +35,103 @@ def get_retry(url: str, retries: int = 5, backoff_factor: float = 0.5, timeout:
         read=retries,
         connect=retries,
         backoff_factor=backoff_factor,
-        status_forcelist=(500, 502, 503, 504),
+        status_forcelist=(429, 500, 502, 503, 504),
         allowed_methods=("GET",),
         raise_on_status=False
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
     session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def configure_session(retries: int = 5, backoff_factor: float = 0.5, pool_size: int = POOL_SIZE) -> requests.Session:
+    """
+    Replace the shared session used by `get_retry` with one built from these settings.
+    """
+    global _session
+    if _session is not None:
+        _session.close()
+    _session_config.update(retries=retries, backoff_factor=backoff_factor, pool_size=pool_size)
+    _session = build_session(**_session_config)
+    return _session
+
+def get_session() -> requests.Session:
+    """Return the shared pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        _session = build_session(**_session_config)
+    return _session
+
+def get_retry(url: str, retries: int = 5, backoff_factor: float = 0.5, timeout: int = 30, **kwargs) -> requests.Response:
+    """
+    Perform a GET request with automatic retries and exponential backoff.
+
+    Requests go through one module-level pooled session, so connections to
+    the same host are kept alive and reused between calls. Passing a retry
+    policy other than the shared one builds a dedicated session for this call.
+
+    Each call takes a slot from the host's adaptive limiter (`src.ratelimit`),
+    so concurrent callers ramp up until responses slow down, fail or get
+    throttled, then back off. Retried 429/5xx statuses count as congestion.
+    With `stream=True` the body is read after this returns, so the slot is
+    held until the response is closed and the limiter sees the time of the
+    whole download, not just the headers; callers must close the response
+    (e.g. `with response:`).
+
+    Retry logic:
+        sleep_time = backoff_factor * (2 ** (retry_number - 1))
+    Args:
+        url (str): The full URL to fetch.
+        retries (int, optional): Maximum number of retry attempts. Defaults to 5.
+        backoff_factor (float, optional): Base factor for exponential backoff. Defaults to 0.5.
+        timeout (int, optional): Timeout in seconds for the request. Defaults to 30.
+        **kwargs: Additional keyword arguments passed directly to `requests.get()`.
+            Examples:
+                - stream=True (for large files)
+                - headers={'User-Agent': '...'}
+                - params={'key': 'value'}
+    """
+    session = get_session()
+    if (retries, backoff_factor) != (_session_config["retries"], _session_config["backoff_factor"]):
+        session = build_session(retries, backoff_factor, pool_size=1)
+
+    limiter = limiter_for(url)
+    limiter.acquire()
+    t0 = time.perf_counter()
+    try:
+        response = session.get(url, timeout=timeout, **kwargs)
+    except BaseException:
+        _release(limiter, t0, None)
+        raise
+
+    if not kwargs.get("stream"):
+        _release(limiter, t0, response)
+        return response
 
-    response = session.get(url, timeout=timeout, **kwargs)
+    released = threading.Event()
+    close = response.close
 
+    def close_and_release():
+        close()
+        if not released.is_set():
+            released.set()
+            _release(limiter, t0, response)
+
+    response.close = close_and_release
     return response
 
+def _release(limiter, t0: float, response: requests.Response | None):
+    """Give back a limiter slot, reporting latency since `t0` and how the request went."""
+    statuses = [response.status_code] if response is not None else []
+    retry_state = getattr(response.raw, "retries", None) if response is not None else None
+    statuses += [h.status for h in getattr(retry_state, "history", ()) if h.status]
+    limiter.release(
+        time.perf_counter() - t0,
+        ok=response is not None and not any(s >= 500 for s in statuses),
+        throttled=429 in statuses,
+        retry_after=parse_retry_after(response.headers.get("Retry-After")) if response is not None else None,
+    )
+
 def deduplicate(data_list, key_attr: str):
     """
     Deduplicate a list of objects based on a specified attribute.
@@ -56,58 +149,192 @@ def deduplicate(data_list, key_attr: str):
             seen.add(key_val)
     return deduped
 
-def combine():
+COMBINE_STATE_PATH = Path("data/hts/combine_state.json")
+COMBINE_FORMAT = 1
+
+# Per-chapter components of the combined schedule: (file, field in Chapter, model)
+CHAPTER_PARTS = {
+    "notes": (Path("data/notes/chapter/chapter_notes_latest.json"), ChapterNote),
+    "additional": (Path("data/notes/additional/additional_us_notes_latest.json"), AdditionalUSNotes),
+    "table": (Path("data/tables/tariff_tables_all_latest.json"), TariffTable),
+}
+# Placeholder for a chapter in the skeleton of the combined file; noncharacters never occur in HTS text
+_CHAPTER_MARK = "\ufdd0chapter:"
+_CHAPTER_RE = re.compile(r'^( *)"\ufdd0chapter:([^"\ufdd0]*)\ufdd0"', re.MULTILINE)
+
+def _file_digest(path: Path) -> str | None:
+    h = hashlib.sha256()
+    if not path.exists():
+        return None
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _entry_digest(entry) -> str:
+    return hashlib.sha256(json.dumps(entry, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _chapter_entries(path: Path, wanted: set = None):
+    """(chapter number, raw entry) pairs of a per-chapter component file, streamed; only `wanted` if given."""
+    if not path.exists():
+        return
+    for entry in iter_json_array(path):
+        ch = str(entry.get("chapter_number"))
+        if wanted is None or ch in wanted:
+            yield ch, entry
+
+def _stamp(path: Path) -> list | None:
+    st = path.stat() if path.exists() else None
+    return [st.st_size, st.st_mtime_ns] if st else None
+
+def combine(sharded: bool = False, force: bool = False) -> dict:
     """
     Combine all parsed HTS components (sections, notes, tables)
     into one hierarchical JSON structure.
+
+    The combine is incremental. `data/hts/combine_state.json` records, per
+    chapter, a hash of its inputs (section, title, chapter notes, additional
+    notes, tariff table) and the byte range of the chapter in the last
+    `hts_full_latest.json`. Only chapters whose inputs changed are validated
+    and serialised again; the bytes of every other chapter are copied from
+    the previous file. Component files whose hash is unchanged are not even
+    parsed. The output is byte-identical to a full rebuild.
+
+    Args:
+        sharded (bool, optional): Also write the chapter-sharded layout
+            (`data/hts/chapters/`, see `src.shards`). Defaults to False.
+        force (bool, optional): Ignore the saved state and rebuild every chapter.
+    Returns:
+        dict: Chapters in total, rebuilt and reused, and the time taken in seconds.
     """
+    t0 = time.perf_counter()
 
     def load_json(path):
         return json.loads(path.read_text(encoding="utf-8")) if path.exists() else []
 
-    # Load components
+    path = Path("data/hts")
+    path.mkdir(parents=True, exist_ok=True)
+    latest_path = path / (f"hts_full_latest.json")
+    version_path = path / (f"hts_full_v{date.today().isoformat()}.json")
+
+    state = None
+    if not force and COMBINE_STATE_PATH.exists():
+        state = json.loads(COMBINE_STATE_PATH.read_text(encoding="utf-8"))
+        # Chapter bytes are only reusable from the exact file the state describes
+        if state.get("format") != COMBINE_FORMAT or state.get("output") != _stamp(latest_path):
+            state = None
+
+    # Small components are loaded and validated in full every time
     sections = load_json(Path(f"data/sections/hts_sections_latest.json"))
-    general_notes = load_json(Path("data/notes/general/general_notes_latest.json"))
-    section_notes = load_json(Path(f"data/notes/section/section_notes_latest.json"))
-    chapter_notes = load_json(Path(f"data/notes/chapter/chapter_notes_latest.json"))
-    add_us_notes = load_json(Path(f"data/notes/additional/additional_us_notes_latest.json"))
-    tables = load_json(Path(f"data/tables/tariff_tables_all_latest.json"))
-
-    # Convert lists to dicts of proper Pydantic objects
-    general_notes_map = [GeneralNote(**g) for g in general_notes]
-    sec_notes_map = {s["section_number"]: SectionNote(**s) for s in section_notes}
-    ch_notes_map = {c["chapter_number"]: ChapterNote(**c) for c in chapter_notes}
-    add_notes_map = {a["chapter_number"]: AdditionalUSNotes(**a) for a in add_us_notes}
-    tables_map = {t["chapter_number"]: TariffTable(**t) for t in tables}
-
-    full_sections = []
+    general_notes = load_models(Path("data/notes/general/general_notes_latest.json"), GeneralNote)
+    section_notes = load_models(Path(f"data/notes/section/section_notes_latest.json"), SectionNote)
+    sec_notes_map = {s.section_number: s for s in section_notes}
+
+    # Per-chapter hashes of each large component, recomputed only for files that changed
+    inputs, part_hashes = {}, {}
+    for part, (part_path, _) in CHAPTER_PARTS.items():
+        inputs[part] = _file_digest(part_path)
+        if state and state["inputs"].get(part) == inputs[part]:
+            part_hashes[part] = state["parts"][part]
+        else:
+            part_hashes[part] = {ch: _entry_digest(e) for ch, e in _chapter_entries(part_path)}
+
+    chapter_hashes = {}
     for s in sections:
-        sec_number = s["sec_number"]
-        chapters = []
         for ch in s["chapters"]:
             ch_num = ch["ch_number"]
-            chapter = Chapter(
-                ch_number=ch_num,
-                title=ch["title"],
-                notes=ch_notes_map.get(ch_num),
-                additional=add_notes_map.get(ch_num),
-                table=tables_map.get(ch_num),
-            )
-            chapters.append(chapter)
-
-        section = Section(
-            sec_number=sec_number,
-            title=s["title"],
-            notes=sec_notes_map.get(sec_number),
-            chapters=chapters,
-        )
-        full_sections.append(section)
+            key = [s["sec_number"], ch_num, ch["title"]] + [part_hashes[p].get(ch_num) for p in CHAPTER_PARTS]
+            chapter_hashes[ch_num] = _entry_digest(key)
+    old_chapters = state["chapters"] if state else {}
+    rebuild = {ch for ch, h in chapter_hashes.items() if old_chapters.get(ch, {}).get("hash") != h}
+    if sharded:
+        # A shard is reused only if it was written from the same inputs; a
+        # non-sharded combine in between leaves it behind
+        from .shards import stale_shards
+        need_data = rebuild | stale_shards(chapter_hashes)
+    else:
+        need_data = rebuild
 
-    path = Path("data/hts")
-    path.mkdir(parents=True, exist_ok=True)
-    full_data = HTSData(general_notes=general_notes_map, sections=full_sections)
-    full_data_json = json.dumps(full_data.model_dump(), indent=2, ensure_ascii=False)
-    latest_path = path / (f"hts_full_latest.json")
-    version_path = path / (f"hts_full_v{date.today().isoformat()}.json")
-    latest_path.write_text(full_data_json, encoding="utf-8")
-    version_path.write_text(full_data_json, encoding="utf-8")
\ No newline at end of file
+    # Validate and dump only the chapters that need it
+    parts = {p: {} for p in CHAPTER_PARTS}
+    for part, (part_path, model) in CHAPTER_PARTS.items():
+        for ch, entry in _chapter_entries(part_path, need_data):
+            parts[part][ch] = model.model_validate(entry, strict=True)
+    chapter_data = {}
+    for s in sections:
+        for ch in s["chapters"]:
+            ch_num = ch["ch_number"]
+            if ch_num in need_data:
+                chapter_data[ch_num] = Chapter(
+                    ch_number=ch_num,
+                    title=ch["title"],
+                    notes=parts["notes"].get(ch_num),
+                    additional=parts["additional"].get(ch_num),
+                    table=parts["table"].get(ch_num),
+                ).model_dump()
+
+    # Skeleton with a placeholder per chapter; Section/HTSData field order as in model_dump()
+    skeleton = {
+        "general_notes": [n.model_dump() for n in general_notes],
+        "sections": [
+            {
+                "sec_number": s["sec_number"],
+                "title": s["title"],
+                "notes": sec_notes_map[s["sec_number"]].model_dump() if s["sec_number"] in sec_notes_map else None,
+                "chapters": [f"{_CHAPTER_MARK}{ch['ch_number']}\ufdd0" for ch in s["chapters"]],
+            }
+            for s in sections
+        ],
+    }
+    skeleton_json = json.dumps(skeleton, indent=2, ensure_ascii=False)
+
+    # Splice chapter bytes into the skeleton, copying unchanged chapters from the previous file
+    tmp_path = latest_path.with_name(latest_path.name + ".tmp")
+    new_chapters = {}
+    old_file = open(latest_path, "rb") if state else None
+    try:
+        with open(tmp_path, "wb") as out:
+            pos, offset = 0, 0
+            for m in _CHAPTER_RE.finditer(skeleton_json):
+                indent, ch_num = m.group(1), m.group(2)
+                head = skeleton_json[pos:m.start()].encode("utf-8") + indent.encode("utf-8")
+                out.write(head)
+                offset += len(head)
+                if ch_num in rebuild:
+                    text = json.dumps(chapter_data[ch_num], indent=2, ensure_ascii=False)
+                    body = text.replace("\n", "\n" + indent).encode("utf-8")
+                else:
+                    start, end = old_chapters[ch_num]["start"], old_chapters[ch_num]["end"]
+                    old_file.seek(start)
+                    body = old_file.read(end - start)
+                out.write(body)
+                new_chapters[ch_num] = {"hash": chapter_hashes[ch_num], "start": offset, "end": offset + len(body)}
+                offset += len(body)
+                pos = m.end()
+            out.write(skeleton_json[pos:].encode("utf-8"))
+    finally:
+        if old_file:
+            old_file.close()
+    default_store.save_file(tmp_path, latest_path, version_path)
+
+    if sharded:
+        stub = dict(skeleton, sections=[
+            dict(sec, chapters=[chapter_data.get(ch["ch_number"]) or {"ch_number": ch["ch_number"], "title": ch["title"]}
+                                for ch in s["chapters"]])
+            for sec, s in zip(skeleton["sections"], sections)
+        ])
+        write_shards(stub, unchanged=set(chapter_hashes) - need_data, sources=chapter_hashes)
+
+    COMBINE_STATE_PATH.write_text(json.dumps({
+        "format": COMBINE_FORMAT,
+        "output": _stamp(latest_path),
+        "inputs": inputs,
+        "parts": part_hashes,
+        "chapters": new_chapters,
+    }), encoding="utf-8")
+    return {
+        "chapters": len(chapter_hashes),
+        "rebuilt": len(rebuild),
+        "reused": len(chapter_hashes) - len(rebuild),
+        "seconds": time.perf_counter() - t0,
+    }
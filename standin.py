@@ -0,0 +1,75 @@
+import argparse, hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+def make_handler(root: Path):
+    """
+    Build a request handler serving HTS fixtures from `root`.
+
+    Routes:
+        /reststop/file?filename=X            -> root/file/X.pdf
+        /reststop/exportList?from=A&to=B     -> root/exportList/A_B.json
+
+    Every response carries an ETag (SHA-256 of the file) and honours
+    If-None-Match with a 304, like the real site's conditional GETs.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/reststop/file" and "filename" in query:
+                path = root / "file" / f"{query['filename']}.pdf"
+                content_type = "application/pdf"
+            elif url.path == "/reststop/exportList" and "from" in query and "to" in query:
+                path = root / "exportList" / f"{query['from']}_{query['to']}.json"
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            if not path.is_file():
+                self.send_error(404)
+                return
+
+            body = path.read_bytes()
+            etag = f'"{hashlib.sha256(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def main(argv=None):
+    """
+    Serve a local stand-in for hts.usitc.gov so incremental re-ingestion can be
+    exercised without the real site. Point the pipeline at it with
+    `HTS_HOST=http://127.0.0.1:8765 python ingesting.py --incremental`, then
+    replace a fixture file to simulate a new release of one chapter.
+    """
+    parser = argparse.ArgumentParser(description="Serve HTS fixtures over HTTP.")
+    parser.add_argument("root", type=Path, help="Fixture directory with file/ and exportList/ subfolders.")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.root))
+    print(f"Serving {args.root} on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -65,7 +65,7 @@ def main():
     # results = []
     # for ch in range(1, 5): 
     #     path = src.fetch(ch)
-    #     tariff_table = src.parse(path)
+    #     tariff_table = src.parse(path, ch)
     #     results.append(tariff_table)
     # src.save(results)
 
@@ -0,0 +1,41 @@
+import time
+from pathlib import Path
+import numpy as np
+from .query import get_engine
+
+def main(n_queries: int = 10000, k: int = 10, output_path: str = "batch_benchmark.md"):
+    """
+    Benchmark `SearchEngine.search_many` (encode + `score_many`) on a batch of `n_queries` product descriptions.
+
+    The batch is sampled (with a fixed seed) from the tariff row descriptions
+    themselves, so it has realistic lengths and vocabulary. Encoding and
+    scoring are timed separately and written to a Markdown file.
+    """
+    engine = get_engine()
+    rng = np.random.default_rng(0)
+    queries = [engine.table_texts[i] for i in rng.choice(len(engine.table_texts), n_queries)]
+
+    t0 = time.perf_counter()
+    q_embs = engine.model.encode(queries, batch_size=256, normalize_embeddings=True, convert_to_numpy=True)
+    encode_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    engine.score_many(q_embs, k)
+    score_time = time.perf_counter() - t0
+    total_time = encode_time + score_time
+
+    lines = [
+        "# Benchmarks – Batched Multi-Query Search\n\n",
+        f"`SearchEngine.search_many` over {len(engine.tables)} tariff rows with `{engine.model_name}`.  \n",
+        f"Batch: {n_queries} descriptions sampled from the tariff rows, top-{k} per query.\n\n",
+        "| Stage                | Time (seconds) | Queries/sec |\n",
+        "|----------------------|----------------|-------------|\n",
+        f"| {'Encode':<20} | {encode_time:14.2f} | {n_queries / encode_time:11.1f} |\n",
+        f"| {'Score + top-k':<20} | {score_time:14.2f} | {n_queries / score_time:11.1f} |\n",
+        f"| {'Total':<20} | {total_time:14.2f} | {n_queries / total_time:11.1f} |\n",
+    ]
+    Path(output_path).write_text("".join(lines), encoding="utf-8")
+    print(f"Benchmarks written to {output_path}")
+
+if __name__ == "__main__":
+    main()